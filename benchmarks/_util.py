@@ -0,0 +1,29 @@
+"""Measurement helpers shared by the benchmark scripts."""
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+# The scripts are run as `python benchmarks/<name>.py`; make `src` importable.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def cpu_ms(func, runs: int) -> float:
+    """Median CPU time of `runs` calls to `func`, in milliseconds."""
+    timings = []
+    for _ in range(runs):
+        start = time.process_time()
+        func()
+        timings.append((time.process_time() - start) * 1000)
+    return statistics.median(timings)
+
+
+def peak_kib(func) -> float:
+    """Peak memory allocated by one call to `func`, in KiB."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,59 @@
+"""
+Cold-start benchmark for the source registry.
+
+Each scenario runs in a fresh interpreter (like a serverless cold start) and
+measures the time from interpreter start to the point the app can answer a
+request:
+
+  lazy         import main                              (serves /api/sources)
+  lazy+one     import main, then build a single source  (first call to Comick)
+  eager        import main, then build every source     (old startup behaviour)
+
+Run from the repository root:
+
+    python benchmarks/bench_cold_start.py --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    "lazy": "import main",
+    "lazy+one": "import main; main.sources_dict.get('comick')",
+    "eager": "import main; main.sources_dict.load_all()",
+}
+
+TEMPLATE = """
+import time
+start = time.perf_counter()
+{code}
+print(time.perf_counter() - start)
+"""
+
+
+def run_once(code: str) -> float:
+    output = subprocess.check_output(
+        [sys.executable, "-c", TEMPLATE.format(code=code)],
+        cwd=ROOT,
+        stderr=subprocess.DEVNULL,
+    )
+    return float(output.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'scenario':<10} {'median ms':>10} {'min ms':>10} {'max ms':>10}")
+    for name, code in SCENARIOS.items():
+        timings = [run_once(code) * 1000 for _ in range(args.runs)]
+        print(f"{name:<10} {statistics.median(timings):>10.1f} {min(timings):>10.1f} {max(timings):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
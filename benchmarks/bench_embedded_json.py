@@ -0,0 +1,90 @@
+"""
+Compares two ways of reading the gallery JSON embedded in an NHentai
+/g/{id}/ page as JSON.parse("..."):
+
+  dom       the previous path: parse the page, loop over every <script>,
+            greedy regex, a re.sub callback per \\uXXXX escape, two
+            str.replace passes, then json.loads
+  offset    src.lib.embedded_json.extract_json_parse: find the literal by
+            offset in the raw text and decode it in one json.loads pass
+
+Pass saved gallery pages, or --synthetic N to build a page with N image
+entries when no saved pages are at hand. Run from the repository root:
+
+    python benchmarks/bench_embedded_json.py gallery.html --runs 50
+    python benchmarks/bench_embedded_json.py --synthetic 250
+"""
+import argparse
+import json
+import os
+import re
+
+from _util import cpu_ms
+from src.lib.embedded_json import extract_json_parse
+from src.lib.html import parse_html
+
+
+def extract_dom(text: str):
+    soup = parse_html(text)
+    script_data = None
+    for script in soup.select("script"):
+        if script.string and "JSON.parse" in script.string:
+            script_data = script
+            break
+    if not script_data:
+        return None
+
+    json_match = re.search(r'JSON\.parse\(\s*"(.*)"\s*\)', script_data.string)
+    if not json_match:
+        return None
+    json_str = json_match.group(1)
+    json_str = re.sub(r'\\u([0-9a-fA-F]{4})', lambda m: chr(int(m.group(1), 16)), json_str)
+    json_str = json_str.replace('\\"', '"').replace('\\\\', '\\')
+    try:
+        return json.loads(json_str)
+    except Exception:
+        return None
+
+
+def synthetic_page(pages: int) -> str:
+    gallery = {
+        "id": 123456,
+        "media_id": "987654",
+        "title": {"english": "[Circle] Sample Title ☆ (Original)", "japanese": "サンプル", "pretty": "Sample Title"},
+        "images": {"pages": [{"t": "j", "w": 1280, "h": 1807}] * pages, "cover": {"t": "j", "w": 350, "h": 494}},
+        "tags": [{"id": i, "type": "tag", "name": f"tag {i}", "url": f"/tag/tag-{i}/", "count": i * 10} for i in range(40)],
+        "num_pages": pages,
+    }
+    literal = json.dumps(json.dumps(gallery))
+    filler = "<div class='thumb-container'><a class='gallerythumb' href='/g/123456/1/'><img src='x.jpg'></a></div>\n" * pages
+    return (
+        "<html><head><script>window._n_app = {media_server: 7};</script></head><body>"
+        f"<div id='thumbnail-container'>{filler}</div>"
+        f"<script>window._gallery = JSON.parse({literal});</script></body></html>"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pages", nargs="*", help="saved /g/{id}/ pages")
+    parser.add_argument("--synthetic", type=int, default=0, help="also run on a generated page with this many images")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    inputs = []
+    for path in args.pages:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            inputs.append((os.path.basename(path), f.read()))
+    if args.synthetic or not inputs:
+        inputs.append((f"synthetic-{args.synthetic or 250}", synthetic_page(args.synthetic or 250)))
+
+    print(f"{'page':<24} {'path':<8} {'ms':>10} {'same':>6}")
+    for name, text in inputs:
+        expected = extract_json_parse(text)
+        for label, func in (("dom", extract_dom), ("offset", extract_json_parse)):
+            same = func(text) == expected
+            print(f"{name:<24} {label:<8} {cpu_ms(lambda: func(text), args.runs):>10.3f} {str(same):>6}")
+
+
+if __name__ == "__main__":
+    main()
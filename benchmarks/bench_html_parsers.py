@@ -0,0 +1,69 @@
+"""
+Measures how fast each installed HTML backend turns a saved listing page
+into manga entries, using the same extractor the source runs:
+
+  toonily   Toonily._extract_manga_list (chapter lookups off)
+  hentai3   Hentai3._extract_manga_list
+  nhentai   NHentai._parse_search_results
+
+BeautifulSoup backends are run twice: on the whole page ("full") and with
+the source's listing ParseOnly filter ("partial"). Peak memory is the
+largest allocation total tracemalloc sees while parsing and extracting.
+
+Save pages first, e.g.
+
+    curl -s https://toonily.com/ -o toonily.html
+    curl -s "https://3hentai.net/search?q=pages%3A>0&pages=1" -o hentai3.html
+
+then run from the repository root:
+
+    python benchmarks/bench_html_parsers.py toonily toonily.html --runs 20
+"""
+import argparse
+import os
+
+from _util import cpu_ms, peak_kib
+from src.lib.html import available_parsers, parse_html
+
+
+def extractor(source: str):
+    """Returns (extract, listing ParseOnly) for the source."""
+    if source == "toonily":
+        from src.sources import toonily
+        scraper = toonily.Toonily()
+        return lambda soup: scraper._extract_manga_list(soup, include_chapters=False), toonily.LISTING_ONLY
+    if source == "hentai3":
+        from src.sources import hentai3
+        return hentai3.Hentai3()._extract_manga_list, hentai3.LISTING_ONLY
+    from src.sources import nhentai
+    return nhentai.NHentai()._parse_search_results, nhentai.LISTING_ONLY
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", choices=("toonily", "hentai3", "nhentai"))
+    parser.add_argument("pages", nargs="+", help="saved HTML files")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    extract, only = extractor(args.source)
+    print(f"{'page':<24} {'parser':<12} {'mode':<8} {'parse ms':>10} {'MB/s':>8} {'peak KiB':>10} {'items':>6}")
+    for path in args.pages:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            markup = f.read()
+        size_mb = len(markup.encode("utf-8")) / (1024 * 1024)
+
+        for backend in available_parsers():
+            modes = [("full", None)]
+            if backend != "selectolax":
+                modes.append(("partial", only))
+            for mode, parse_only in modes:
+                run = lambda: extract(parse_html(markup, backend, only=parse_only))
+                items = run()
+                elapsed = cpu_ms(run, args.runs)
+                throughput = size_mb / (elapsed / 1000) if elapsed else float("inf")
+                print(f"{os.path.basename(path):<24} {backend:<12} {mode:<8} {elapsed:>10.2f} {throughput:>8.2f} {peak_kib(run):>10.0f} {len(items):>6}")
+
+
+if __name__ == "__main__":
+    main()
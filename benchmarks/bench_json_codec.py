@@ -0,0 +1,97 @@
+"""
+Decodes a recorded Comick /comic/{hid}/chapters response with each
+installed JSON codec, plus msgspec's typed decode into the fields
+Comick._get_chapters actually reads (when msgspec is installed).
+
+Record a payload first (this uses the Comick source's own transport):
+
+    python benchmarks/bench_json_codec.py --record 6Gzm5v0y chapters.json
+
+or generate one with the same shape (15000 chapters is about 6 MB):
+
+    python benchmarks/bench_json_codec.py --generate 15000 chapters.json
+
+then run from the repository root:
+
+    python benchmarks/bench_json_codec.py chapters.json --runs 20
+"""
+import argparse
+import json
+import random
+
+from _util import cpu_ms, peak_kib
+from src.lib import json_codec
+from src.sources.comick import ChapterListResponse, Comick
+
+
+def record(hid: str, path: str):
+    scraper = Comick()
+    response = scraper.fetch(f"{scraper.api_url}/comic/{hid}/chapters", params={"tachiyomi": "true", "limit": str(scraper.chapters_limit), "lang": scraper.lang})
+    response.raise_for_status()
+    with open(path, "wb") as f:
+        f.write(response.content)
+    print(f"Saved {len(response.content)} bytes to {path}")
+
+
+def generate(count: int, path: str):
+    # Mirrors the fields of a real /comic/{hid}/chapters entry, most of
+    # which Comick._get_chapters never reads.
+    rng = random.Random(count)
+    chapters = []
+    for number in range(count, 0, -1):
+        chapters.append({
+            "id": rng.randrange(10 ** 7),
+            "chap": str(number),
+            "title": rng.choice([None, f"Chapter title {number}"]),
+            "vol": str(number // 10 + 1),
+            "lang": rng.choice(["en", "en", "fr", "es-la", "pt-br"]),
+            "created_at": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T12:00:00+00:00",
+            "updated_at": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T12:00:00+00:00",
+            "publish_at": None,
+            "up_count": rng.randrange(500),
+            "down_count": rng.randrange(20),
+            "is_the_last_chapter": False,
+            "hid": "".join(rng.choice("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789") for _ in range(8)),
+            "identities": None,
+            "group_name": [rng.choice(["Official", "Scans Team", "Night Readers"])],
+            "md_chapters_groups": [{"md_groups": {"title": "Scans Team", "slug": "scans-team"}}],
+        })
+    data = json.dumps({"chapters": chapters, "total": count, "limit": count}).encode("utf-8")
+    with open(path, "wb") as f:
+        f.write(data)
+    print(f"Saved {len(data)} bytes ({count} chapters) to {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("payload", nargs="?", help="recorded chapters response")
+    parser.add_argument("--record", nargs=2, metavar=("HID", "PATH"), help="fetch a chapters response and save it")
+    parser.add_argument("--generate", nargs=2, metavar=("COUNT", "PATH"), help="write a synthetic chapters response")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.record:
+        record(*args.record)
+        return
+    if args.generate:
+        generate(int(args.generate[0]), args.generate[1])
+        return
+    if not args.payload:
+        parser.error("a payload file (or --record or --generate) is required")
+
+    with open(args.payload, "rb") as f:
+        data = f.read()
+
+    variants = [(codec, lambda codec=codec: json_codec.loads(data, codec)) for codec in json_codec.CODECS if json_codec._available(codec)]
+    if json_codec._available("msgspec"):
+        variants.append(("msgspec typed", lambda: json_codec.decode(data, ChapterListResponse, "msgspec")))
+
+    print(f"payload: {len(data) / 1024:.0f} KiB")
+    print(f"{'codec':<16} {'decode ms':>10} {'peak KiB':>10} {'chapters':>9}")
+    for name, func in variants:
+        chapters = len(func().get("chapters", []))
+        print(f"{name:<16} {cpu_ms(func, args.runs):>10.2f} {peak_kib(func):>10.0f} {chapters:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Compares the two ways the NHentai source can load a gallery:
+
+  html    GET /g/{id}/ and decode the embedded JSON.parse blob
+  api     GET /api/gallery/{id} and decode the JSON body directly
+
+For each gallery it reports the bytes transferred and the CPU time spent
+turning the response into details and a page list. Downloads happen once per
+path; parsing is repeated `--runs` times and the median is reported.
+
+Run from the repository root:
+
+    python benchmarks/bench_nhentai_api.py 123456 234567 --runs 20
+"""
+import argparse
+
+from _util import cpu_ms
+from src.sources.nhentai import NHentai
+
+
+def parse_html(scraper: NHentai, gallery_id: str, text: str):
+    data = scraper._extract_gallery_json(text)
+    details = scraper._parse_manga_details_json(data, gallery_id)
+    pages = scraper._pages_from_json(data, scraper.preferences["media_server"])
+    return details, pages
+
+
+def parse_api(scraper: NHentai, gallery_id: str, response):
+    data = response.json()
+    details = scraper._parse_manga_details_json(data, gallery_id)
+    pages = scraper._pages_from_json(data, scraper.preferences["media_server"])
+    return details, pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("ids", nargs="+", help="gallery IDs to load")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    scraper = NHentai()
+    print(f"{'gallery':<10} {'path':<5} {'bytes':>10} {'parse ms':>10} {'pages':>6}")
+    for gallery_id in args.ids:
+        html = scraper.fetch(f"{scraper.base_url}/g/{gallery_id}/")
+        api = scraper.fetch(f"{scraper.api_url}/gallery/{gallery_id}", headers=scraper.api_headers)
+
+        for name, response, parse in (
+            ("html", html, lambda: parse_html(scraper, gallery_id, html.text)),
+            ("api", api, lambda: parse_api(scraper, gallery_id, api)),
+        ):
+            if response.status_code != 200:
+                print(f"{gallery_id:<10} {name:<5} {'HTTP ' + str(response.status_code):>10}")
+                continue
+            # Compressed size when the server sends Content-Length, decoded size otherwise.
+            wire_bytes = int(response.headers.get("content-length") or len(response.content))
+            _, pages = parse()
+            print(f"{gallery_id:<10} {name:<5} {wire_bytes:>10} {cpu_ms(parse, args.runs):>10.2f} {len(pages):>6}")
+
+
+if __name__ == "__main__":
+    main()
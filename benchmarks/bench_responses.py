@@ -0,0 +1,83 @@
+"""
+Times how long it takes to turn a listing (25 manga, each with
+`--chapters` entries in chapter_ids) into response bytes:
+
+  before    FastAPI's old path: jsonable_encoder over [manga.get() ...],
+            then JSONResponse.render (stdlib json)
+  after     manga_list_response: Manga.to_json per item through the
+            configured codec, joined into one body
+
+For each it reports the median time and the memory allocated while
+building one response. Run from the repository root:
+
+    python benchmarks/bench_responses.py --chapters 500 --runs 50
+"""
+import argparse
+import json
+
+from _util import cpu_ms, peak_kib
+from src.lib import json_codec
+from src.lib.types import Manga
+
+
+def sample_listing(count: int, chapters: int):
+    return [
+        Manga(
+            id=f"manga-{i}",
+            url=f"/series/manga-{i}/",
+            title=f"Sample Manga {i} – Ünïcödé",
+            author="Author Name",
+            description="A fairly long description of the series. " * 10,
+            poster=f"https://cdn.example.com/covers/{i}.jpg",
+            chapters=chapters,
+            tags=["Action", "Adventure", "Fantasy"],
+            genres=["Action", "Adventure", "Fantasy"],
+            status="Ongoing",
+            rating=8.7,
+            chapter_ids={f"Chapter {n}": f"/series/manga-{i}/chapter-{n}/" for n in range(chapters, 0, -1)},
+        )
+        for i in range(count)
+    ]
+
+
+def before(manga_list) -> bytes:
+    from fastapi.encoders import jsonable_encoder
+    content = jsonable_encoder([manga.get() for manga in manga_list])
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def before_without_fastapi(manga_list) -> bytes:
+    # Same render step, for environments without FastAPI installed.
+    content = [manga.get() for manga in manga_list]
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def after(manga_list) -> bytes:
+    return b"[" + b",".join(manga.to_json() for manga in manga_list) + b"]"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--manga", type=int, default=25)
+    parser.add_argument("--chapters", type=int, default=300)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    manga_list = sample_listing(args.manga, args.chapters)
+    try:
+        import fastapi  # noqa: F401
+        variants = [("before", before)]
+    except ImportError:
+        variants = [("before (no jsonable_encoder)", before_without_fastapi)]
+    variants.append((f"after ({json_codec.codec_name()})", after))
+
+    print(f"{'path':<30} {'ms':>8} {'peak KiB':>10} {'bytes':>10}")
+    for name, func in variants:
+        body = func(manga_list)
+        assert json.loads(body) == [manga.get() for manga in manga_list]
+        run = lambda: func(manga_list)
+        print(f"{name:<30} {cpu_ms(run, args.runs):>8.2f} {peak_kib(run):>10.0f} {len(body):>10}")
+
+
+if __name__ == "__main__":
+    main()
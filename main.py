@@ -1,46 +1,225 @@
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Any, AsyncIterator, List, Optional
+import asyncio
+import math
+import time
+from src.lib.types import Scraper, Chapter, Manga
+from src.lib import json_codec
+from src.lib.registry import SourceRegistry
+from src.lib.dispatch import Dispatcher, SourceBusyError
+from src.lib.async_http import close_async_client
+from src.lib.config import env_int, source_env_float
+from src.lib.singleflight import SingleFlight
+from src.lib.cache import cache_stale_ttl, cache_ttl, create_cache, make_key
+from src.lib.refresh import BackgroundRefresher
+from src.lib.archiver import create_archiver
+from src.lib.ratelimit import RateLimitTimeout, rate_limiter
+from src.lib.transport import add_timing_hook, http_stats
+from src.lib.clearance import get_clearance_store
+from src.lib.breaker import CallOutcome, CircuitBreakers, CircuitOpenError, note_response
 
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import JSONResponse
-from typing import List, Optional
-import importlib
-import inspect
-import os
-from src.lib.types import Scraper
-
-app = FastAPI()
-
-def get_all_sources():
-    """
-    Dynamically imports all scraper classes from the sources directory.
-    Returns a list of initialized scraper instances.
-    """
-    scrapers = []
-    sources_dir = os.path.join('src', 'sources')
-    
-    if not os.path.exists(sources_dir):
-        return scrapers
-    
-    for filename in os.listdir(sources_dir):
-        if filename.endswith('.py') and not filename.startswith('__'):
-            module_name = f"src.sources.{filename[:-3]}"
-            
-            try:
-                module = importlib.import_module(module_name)
-                
-                for name, obj in inspect.getmembers(module):
-                    if (inspect.isclass(obj) and 
-                        issubclass(obj, Scraper) and 
-                        obj is not Scraper):
-                        
-                        scraper_instance = obj()
-                        scrapers.append(scraper_instance)
-            except Exception as e:
-                print(f"Error importing {module_name}: {e}")
-    
-    return scrapers
-
-sources = get_all_sources()
-sources_dict = {scraper.name.lower(): scraper for scraper in sources}
+class FastJSONResponse(JSONResponse):
+    """
+    Renders with the configured JSON codec (orjson when installed). Routes
+    that return one directly with pre-encoded bytes also skip FastAPI's
+    jsonable_encoder pass.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return json_codec.dumps(content)
+
+def json_response(content: Any) -> FastJSONResponse:
+    return FastJSONResponse(json_codec.dumps(content))
+
+def manga_list_response(manga_list: List[Manga]) -> FastJSONResponse:
+    return FastJSONResponse(b"[" + b",".join(manga.to_json() for manga in manga_list) + b"]")
+
+app = FastAPI(default_response_class=FastJSONResponse)
+
+# Scrapers are imported and built on first use; /api/sources is answered
+# straight from the manifest.
+sources_dict = SourceRegistry.from_manifest()
+dispatcher = Dispatcher(sources_dict.keys())
+breakers = CircuitBreakers(sources_dict.keys())
+# Upstream 5xx responses and network errors reach the breaker through here.
+add_timing_hook(note_response)
+inflight = SingleFlight()
+cache = create_cache()
+refresher = BackgroundRefresher(env_int("CACHE_REFRESH_CONCURRENCY", 2))
+# Opt-in: only set when CHAPTER_ARCHIVE_DIR is configured.
+archiver = create_archiver()
+
+def get_scraper(source: str) -> Scraper:
+    if source not in sources_dict:
+        raise HTTPException(status_code=404, detail=f"Source '{source}' not found")
+    try:
+        return sources_dict.get(source)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Source '{source}' failed to load: {e}")
+
+async def fetch_source(source: str, scraper: Scraper, method: str, key: str, args: tuple, kwargs: dict):
+    """
+    Calls the scraper, sharing one execution between identical concurrent
+    calls, and stores a usable result in the cache.
+    """
+    func = getattr(scraper, method)
+    ttl = cache_ttl(method)
+    breaker = breakers.get(source)
+
+    async def run():
+        # Fails fast while the source's circuit is open, so no worker ends
+        # up waiting on a dead upstream.
+        breaker.before_call()
+        call = CallOutcome()
+        try:
+            result = await dispatcher.run(source, call.wrap(func), *args, **kwargs)
+        except (SourceBusyError, NotImplementedError, RateLimitTimeout, asyncio.CancelledError):
+            # None of these say anything about the upstream's health.
+            breaker.cancel()
+            raise
+        except Exception:
+            breaker.record(False)
+            raise
+        breaker.record(not call.failed, call.duration)
+        if ttl > 0 and is_cacheable(result):
+            await cache.set_async(key, result, ttl, cache_stale_ttl(method))
+        return result
+
+    return await inflight.do(key, run, operation=f"{source}.{method}")
+
+async def cached_result(source: str, scraper: Scraper, method: str, key: str, args: tuple, kwargs: dict):
+    """
+    Returns the cached result for a call, or None. For operations with a
+    stale window (popular and latest by default), an expired entry is still
+    returned and a background refresh is started for it.
+    """
+    if cache_ttl(method) <= 0:
+        return None
+    stale_ttl = cache_stale_ttl(method)
+    entry = await cache.get_entry_async(key, allow_stale=stale_ttl > 0)
+    if entry is None:
+        return None
+
+    value, fresh = entry
+    if not fresh:
+        refresher.schedule(source, key, lambda: fetch_source(source, scraper, method, key, args, kwargs))
+    return value
+
+async def call_source(source: str, method: str, *args, **kwargs):
+    """
+    Runs `scraper.<method>(*args)` on the source's worker pool so a slow
+    upstream never blocks the event loop or other sources. AsyncScraper
+    methods are awaited directly.
+
+    Identical calls that overlap in time share a single upstream execution,
+    and results are cached for the operation's TTL (see src/lib/cache.py).
+    """
+    scraper = get_scraper(source)
+    source = source.lower()
+    key = make_key(source, method, args, kwargs)
+    cached = await cached_result(source, scraper, method, key, args, kwargs)
+    if cached is not None:
+        return cached
+
+    try:
+        return await fetch_source(source, scraper, method, key, args, kwargs)
+    except SourceBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except CircuitOpenError as e:
+        raise circuit_open(e)
+    except RateLimitTimeout as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))})
+    except NotImplementedError as e:
+        raise HTTPException(status_code=501, detail=str(e) or f"'{method}' is not supported by {source}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def circuit_open(error: CircuitOpenError) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=str(error),
+        headers={"Retry-After": str(max(1, math.ceil(error.retry_after))), "X-Circuit-State": "open"}
+    )
+
+def is_cacheable(result) -> bool:
+    # Most scrapers return an empty list or page list instead of raising when
+    # the upstream fails, so empty results are never cached.
+    if result is None:
+        return False
+    if isinstance(result, list):
+        return len(result) > 0 and all(item is not None for item in result)
+    if isinstance(result, Chapter):
+        return len(result.pages) > 0
+    return True
+
+def listing_options(source: str, chapters: Optional[bool]) -> dict:
+    # Only forward options the source understands, so `chapters` is ignored
+    # by sources that always include (or never have) chapter maps.
+    options = {}
+    if chapters is not None and "include_chapters" in get_scraper(source).listing_options:
+        options["include_chapters"] = chapters
+    return options
+
+def stream_format(request: Request, stream: bool) -> Optional[str]:
+    accept = request.headers.get("accept", "")
+    if "text/event-stream" in accept:
+        return "sse"
+    if "application/x-ndjson" in accept or stream:
+        return "ndjson"
+    return None
+
+async def _encode_stream(items: AsyncIterator, fmt: str) -> AsyncIterator[bytes]:
+    try:
+        async for manga in items:
+            if manga is None:
+                continue
+            payload = manga.to_json()
+            yield b"data: " + payload + b"\n\n" if fmt == "sse" else payload + b"\n"
+    except Exception as e:
+        # Headers are already sent, so errors are reported in-band.
+        error = json_codec.dumps({"error": str(e)})
+        yield b"event: error\ndata: " + error + b"\n\n" if fmt == "sse" else error + b"\n"
+        return
+    if fmt == "sse":
+        yield b"event: end\ndata: {}\n\n"
+
+async def _iterate(items: list) -> AsyncIterator:
+    for item in items:
+        yield item
+
+async def stream_source(fmt: str, source: str, method: str, *args, **kwargs) -> StreamingResponse:
+    """
+    Streams `scraper.<method>(*args)` (one of the iter_* generators) as
+    NDJSON or server-sent events, sending each manga as soon as it is built.
+    A cached result of the matching list method is streamed instead when
+    there is one.
+    """
+    scraper = get_scraper(source)
+    list_method = method[len("iter_"):]
+    key = make_key(source.lower(), list_method, args, kwargs)
+    cached = await cached_result(source.lower(), scraper, list_method, key, args, kwargs)
+    if cached is not None:
+        items = _iterate(cached)
+    else:
+        try:
+            breakers.get(source).check()
+            items = dispatcher.stream(source.lower(), getattr(scraper, method), *args, **kwargs)
+        except SourceBusyError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        except CircuitOpenError as e:
+            raise circuit_open(e)
+
+    media_type = "text/event-stream" if fmt == "sse" else "application/x-ndjson"
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(_encode_stream(items, fmt), media_type=media_type, headers=headers)
+
+@app.on_event("shutdown")
+async def shutdown_dispatcher():
+    dispatcher.shutdown()
+    await close_async_client()
 
 @app.get("/")
 async def root():
@@ -48,52 +227,146 @@ async def root():
 
 @app.get("/api/sources")
 async def get_sources():
-    return [{"name": s.name, "url": s.base_url} for s in sources]
+    return [
+        {**info, "circuit": breakers.get(key).stats()}
+        for key, info in zip(sources_dict.keys(), sources_dict.describe())
+    ]
+
+@app.get("/api/stats")
+async def get_stats():
+    clearance = get_clearance_store()
+    # Both read SQLite files, so they are kept off the event loop.
+    cache_stats, clearance_stats = await asyncio.gather(
+        asyncio.to_thread(cache.stats),
+        asyncio.to_thread(clearance.stats) if clearance else asyncio.sleep(0)
+    )
+    return {
+        "dispatch": dispatcher.stats(),
+        "coalescing": inflight.stats(),
+        "cache": cache_stats,
+        "refresh": refresher.stats(),
+        "rate_limit": rate_limiter.stats(),
+        "http": http_stats.stats(),
+        "clearance": clearance_stats,
+        "archive": archiver.stats() if archiver else None
+    }
 
 @app.get("/api/manga/popular")
-async def get_popular_manga(source: str, page: int = 1):
-    if source.lower() not in sources_dict:
-        raise HTTPException(status_code=404, detail=f"Source '{source}' not found")
-    
-    scraper = sources_dict[source.lower()]
-    try:
-        manga_list = scraper.popular_manga(page)
-        return [manga.get() for manga in manga_list]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def get_popular_manga(request: Request, source: str, page: int = 1, stream: bool = False, chapters: Optional[bool] = None):
+    options = listing_options(source, chapters)
+    fmt = stream_format(request, stream)
+    if fmt:
+        return await stream_source(fmt, source, "iter_popular_manga", page, **options)
+
+    manga_list = await call_source(source, "popular_manga", page, **options)
+    return manga_list_response(manga_list)
 
 @app.get("/api/manga/latest")
-async def get_latest_manga(source: str, page: int = 1):
-    if source.lower() not in sources_dict:
-        raise HTTPException(status_code=404, detail=f"Source '{source}' not found")
-    
-    scraper = sources_dict[source.lower()]
-    try:
-        manga_list = scraper.latest_manga(page)
-        return [manga.get() for manga in manga_list]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def get_latest_manga(request: Request, source: str, page: int = 1, stream: bool = False, chapters: Optional[bool] = None):
+    options = listing_options(source, chapters)
+    fmt = stream_format(request, stream)
+    if fmt:
+        return await stream_source(fmt, source, "iter_latest_manga", page, **options)
+
+    manga_list = await call_source(source, "latest_manga", page, **options)
+    return manga_list_response(manga_list)
+
+async def search_pages(source: str, q: str, page: int, pages: int, options: dict) -> list:
+    """
+    Fetches `pages` consecutive result pages concurrently and merges them in
+    page order, dropping manga already seen on an earlier page. Pages that
+    fail are skipped unless all of them do.
+    """
+    results = await asyncio.gather(
+        *(call_source(source, "search_manga", q, number, **options) for number in range(page, page + pages)),
+        return_exceptions=True
+    )
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if len(errors) == len(results):
+        raise errors[0]
+
+    merged = []
+    seen = set()
+    for manga_list in results:
+        if isinstance(manga_list, BaseException):
+            continue
+        for manga in manga_list:
+            if manga is None or manga.url in seen:
+                continue
+            seen.add(manga.url)
+            merged.append(manga)
+    return merged
 
 @app.get("/api/manga/search")
-async def search_manga(source: str, q: str, page: int = 1):
-    if source.lower() not in sources_dict:
-        raise HTTPException(status_code=404, detail=f"Source '{source}' not found")
-    
-    scraper = sources_dict[source.lower()]
+async def search_manga(request: Request, source: str, q: str, page: int = Query(1, ge=1), pages: int = Query(1, ge=1, le=10), stream: bool = False, chapters: Optional[bool] = None):
+    options = listing_options(source, chapters)
+    if pages > 1:
+        manga_list = await search_pages(source, q, page, pages, options)
+        return manga_list_response(manga_list)
+
+    fmt = stream_format(request, stream)
+    if fmt:
+        return await stream_source(fmt, source, "iter_search_manga", q, page, **options)
+
+    manga_list = await call_source(source, "search_manga", q, page, **options)
+    return manga_list_response(manga_list)
+
+async def _search_one(source: str, q: str, page: int, timeout: Optional[float]) -> dict:
+    entry = sources_dict.entry(source)
+    if timeout is None:
+        timeout = source_env_float("SEARCH_ALL_TIMEOUT", source, 10.0)
+
+    result = {"source": entry.name, "status": "ok", "latency_ms": 0, "results": []}
+    started = time.perf_counter()
     try:
-        manga_list = scraper.search_manga(q, page)
-        return [manga.get() for manga in manga_list]
+        manga_list = await asyncio.wait_for(call_source(source, "search_manga", q, page), timeout)
+        result["results"] = [manga.get() for manga in manga_list if manga]
+    except asyncio.TimeoutError:
+        result["status"] = "timeout"
+    except HTTPException as e:
+        result["status"] = "error"
+        result["error"] = e.detail
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        result["status"] = "error"
+        result["error"] = str(e)
+    result["latency_ms"] = round((time.perf_counter() - started) * 1000)
+    return result
+
+@app.get("/api/manga/search/all")
+async def search_all_manga(q: str, page: int = 1, timeout: Optional[float] = Query(None, gt=0)):
+    """
+    Searches every source concurrently. Each source gets its own deadline
+    (SEARCH_ALL_TIMEOUT, or `timeout` seconds if given); sources that miss it
+    are reported as "timeout" instead of holding up the response.
+    """
+    results = await asyncio.gather(*(_search_one(source, q, page, timeout) for source in sources_dict))
+    return json_response({"query": q, "page": page, "sources": results})
 
 @app.get("/api/manga/chapter")
 async def get_chapter(source: str, id: str):
-    if source.lower() not in sources_dict:
-        raise HTTPException(status_code=404, detail=f"Source '{source}' not found")
-    
-    scraper = sources_dict[source.lower()]
-    try:
-        chapter = scraper.get_chapter(id)
-        return chapter.get()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    chapter = await call_source(source, "get_chapter", id)
+    if chapter is None:
+        raise HTTPException(status_code=404, detail=f"Chapter '{id}' not found")
+    if archiver is not None:
+        # Runs after the response is built; never delays it.
+        archiver.schedule(source.lower(), chapter.id, chapter.pages, getattr(get_scraper(source), "headers", None))
+    return FastJSONResponse(chapter.to_json())
+
+@app.get("/api/manga/chapters")
+async def get_chapter_list(source: str, id: str, offset: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=500), order: str = Query("desc", pattern="^(asc|desc)$")):
+    """
+    Pages through a manga's chapters. Sources return the full list newest
+    first; it is cached once and sliced here, so paging through a long
+    series costs one upstream fetch.
+    """
+    records = await call_source(source, "get_chapter_list", id)
+    if order == "asc":
+        records = records[::-1]
+    return json_response({
+        "id": id,
+        "total": len(records),
+        "offset": offset,
+        "limit": limit,
+        "order": order,
+        "chapters": [record.get() for record in records[offset:offset + limit]]
+    })
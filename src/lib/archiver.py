@@ -0,0 +1,154 @@
+import asyncio
+import os
+import re
+from typing import Any, Dict, List, Optional, Set
+
+from src.lib.async_http import get_async_client
+from src.lib.cache import LRUCache
+from src.lib.config import env_int, env_str
+
+_UNSAFE_CHARS = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+def _safe_name(value: str) -> str:
+    return _UNSAFE_CHARS.sub("_", value).strip("_") or "_"
+
+
+def _write_atomic(path: str, data: bytes):
+    # Write next to the target and rename over it, so readers never see a
+    # half-written page and a crash leaves at most a stray .part file.
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.part"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class ByteBudget():
+    """
+    Caps how many downloaded bytes may be held in memory at once. A single
+    item larger than the whole budget is still let through once nothing
+    else is in flight, so it can never wait forever.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self, size: int):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight == 0 or self.in_flight + size <= self.limit)
+            self.in_flight += size
+
+    async def release(self, size: int):
+        async with self._condition:
+            self.in_flight -= size
+            self._condition.notify_all()
+
+
+class ChapterArchiver():
+    """
+    Downloads chapter pages to disk in the background, off the request path.
+    Pages are fetched concurrently (up to `concurrency` at a time) with at
+    most `max_bytes_in_flight` held in memory, and each file is written
+    atomically as <root>/<source>/<chapter id>/<page>.<ext>.
+    """
+
+    def __init__(self, root: str, concurrency: int = 8, max_bytes_in_flight: int = 32 * 1024 * 1024, default_page_size: int = 1024 * 1024):
+        self.root = root
+        self.concurrency = max(1, concurrency)
+        self.max_bytes_in_flight = max_bytes_in_flight
+        self.default_page_size = default_page_size
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._budget: Optional[ByteBudget] = None
+        self._keys: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        # Chapters archived recently, so repeat reads skip the disk checks.
+        self._done = LRUCache(4096)
+        self.scheduled = 0
+        self.pages_written = 0
+        self.pages_skipped = 0
+        self.bytes_written = 0
+        self.failed = 0
+
+    def chapter_dir(self, source: str, chapter_id: str) -> str:
+        return os.path.join(self.root, _safe_name(source), _safe_name(chapter_id))
+
+    def schedule(self, source: str, chapter_id: str, pages: List[str], headers: Optional[Dict[str, str]] = None) -> bool:
+        key = f"{source}:{chapter_id}"
+        if not pages or key in self._keys or self._done.get(key):
+            return False
+
+        self._keys.add(key)
+        self.scheduled += 1
+        task = asyncio.ensure_future(self._archive(key, source, chapter_id, pages, headers or {}))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _archive(self, key: str, source: str, chapter_id: str, pages: List[str], headers: Dict[str, str]):
+        # Created here rather than in __init__ so they belong to the running loop.
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._budget = ByteBudget(self.max_bytes_in_flight)
+
+        directory = self.chapter_dir(source, chapter_id)
+        try:
+            results = await asyncio.gather(
+                *(self._save_page(directory, index, url, headers) for index, url in enumerate(pages)),
+                return_exceptions=True
+            )
+            errors = [result for result in results if isinstance(result, Exception)]
+            if errors:
+                self.failed += len(errors)
+                print(f"Archiving {key} failed for {len(errors)} of {len(pages)} pages: {errors[0]}")
+            else:
+                self._done.set(key, True, 24 * 3600)
+        finally:
+            self._keys.discard(key)
+
+    async def _save_page(self, directory: str, index: int, url: str, headers: Dict[str, str]):
+        ext = os.path.splitext(url.split("?", 1)[0])[1] or ".jpg"
+        path = os.path.join(directory, f"{index:03d}{ext}")
+        if os.path.exists(path):
+            self.pages_skipped += 1
+            return
+
+        async with self._semaphore:
+            async with get_async_client().stream("GET", url, headers=headers) as response:
+                response.raise_for_status()
+                reserved = int(response.headers.get("content-length") or self.default_page_size)
+                await self._budget.acquire(reserved)
+                try:
+                    data = await response.aread()
+                    await asyncio.to_thread(_write_atomic, path, data)
+                finally:
+                    await self._budget.release(reserved)
+
+        self.pages_written += 1
+        self.bytes_written += len(data)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "root": self.root,
+            "running": len(self._keys),
+            "bytes_in_flight": self._budget.in_flight if self._budget else 0,
+            "scheduled": self.scheduled,
+            "pages_written": self.pages_written,
+            "pages_skipped": self.pages_skipped,
+            "bytes_written": self.bytes_written,
+            "failed": self.failed,
+        }
+
+
+def create_archiver() -> Optional[ChapterArchiver]:
+    """Returns an archiver if CHAPTER_ARCHIVE_DIR is set, otherwise None."""
+    root = env_str("CHAPTER_ARCHIVE_DIR", "")
+    if not root:
+        return None
+    return ChapterArchiver(
+        root,
+        concurrency=env_int("CHAPTER_ARCHIVE_CONCURRENCY", 8),
+        max_bytes_in_flight=env_int("CHAPTER_ARCHIVE_MAX_BYTES", 32 * 1024 * 1024),
+    )
@@ -0,0 +1,45 @@
+import asyncio
+from typing import Optional
+
+from src.lib.config import env_float, env_int
+from src.lib.ratelimit import limit_transport
+
+# httpx is imported when the first async source makes a request, so
+# processes that never touch one don't pay for it at startup.
+_client = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _build_client() -> "httpx.AsyncClient":
+    import httpx
+
+    limits = httpx.Limits(
+        max_connections=env_int("ASYNC_HTTP_MAX_CONNECTIONS", 1000),
+        max_keepalive_connections=env_int("ASYNC_HTTP_MAX_KEEPALIVE", 100),
+    )
+    timeout = httpx.Timeout(env_float("ASYNC_HTTP_TIMEOUT", 30.0))
+    # Every request goes through the shared per-host rate limiter.
+    transport = limit_transport(httpx.AsyncHTTPTransport(limits=limits))
+    return httpx.AsyncClient(transport=transport, timeout=timeout, follow_redirects=True)
+
+
+def get_async_client() -> "httpx.AsyncClient":
+    """
+    Returns the process-wide async HTTP client shared by every AsyncScraper.
+    The client is bound to the running event loop and is rebuilt if called
+    from a different one.
+    """
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = _build_client()
+        _client_loop = loop
+    return _client
+
+
+async def close_async_client():
+    global _client, _client_loop
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+    _client_loop = None
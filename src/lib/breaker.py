@@ -0,0 +1,228 @@
+import inspect
+import math
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, Iterable, Optional
+
+from src.lib.config import source_env_float, source_env_int
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, source: str, retry_after: float):
+        super().__init__(f"Source '{source}' is unavailable, retry in {math.ceil(retry_after)}s")
+        self.source = source
+        self.retry_after = retry_after
+
+
+class CallOutcome():
+    """
+    What happened upstream during one scraper call. Scrapers turn failed
+    responses into None or [] rather than raising, so the transport reports
+    each response here (see `note_response`) and the call counts as failed
+    when none of its requests succeeded and at least one ended in a 5xx or a
+    network error.
+
+    `duration` covers only the time the call spent running, less the time
+    it waited on the rate limiter (reported through `note_wait`); time spent
+    in the source's queue isn't counted either.
+
+    Scrapers that fan out to their own threads must run that work in a copy
+    of the caller's context (contextvars.copy_context().run) for it to be
+    counted, so the counters may be updated from several threads at once.
+    """
+
+    __slots__ = ("started", "duration", "waited", "ok", "errors", "_lock")
+
+    def __init__(self):
+        self.started: Optional[float] = None
+        self.duration = 0.0
+        self.waited = 0.0
+        self.ok = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    @property
+    def failed(self) -> bool:
+        return self.errors > 0 and self.ok == 0
+
+    def note(self, status: Optional[int]):
+        with self._lock:
+            if status is None or status >= 500:
+                self.errors += 1
+            else:
+                self.ok += 1
+
+    def note_wait(self, seconds: float):
+        with self._lock:
+            self.waited += seconds
+
+    def wrap(self, func: Callable) -> Callable:
+        """Wraps `func` so the outcome is tracked from where it actually runs."""
+        if inspect.iscoroutinefunction(func):
+            async def run_async(*args, **kwargs):
+                token = self._enter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self._exit(token)
+            return run_async
+
+        def run(*args, **kwargs):
+            token = self._enter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._exit(token)
+        return run
+
+    def _enter(self):
+        self.started = time.monotonic()
+        return _current_call.set(self)
+
+    def _exit(self, token):
+        self.duration = max(0.0, time.monotonic() - self.started - self.waited)
+        _current_call.reset(token)
+
+
+_current_call: ContextVar[Optional[CallOutcome]] = ContextVar("current_call", default=None)
+
+
+def note_response(source: str, method: str, url: str, status: Optional[int], elapsed: float, size: int):
+    """A transport timing hook that reports each response to the call that made it."""
+    call = _current_call.get()
+    if call is not None:
+        call.note(status)
+
+
+def note_wait(seconds: float):
+    """Reports time the current call spent waiting on the rate limiter."""
+    call = _current_call.get()
+    if call is not None:
+        call.note_wait(seconds)
+
+
+class CircuitBreaker():
+    """
+    Tracks the outcome of the last `window` upstream calls for one source.
+    Once at least `min_calls` have been seen and the share of failures (errors,
+    or calls slower than `slow_call_seconds`) reaches `failure_rate`, the
+    circuit opens and calls fail immediately for `open_seconds`.
+
+    After that a single probe call is let through (half-open). If it succeeds
+    the circuit closes; if it fails the circuit opens again.
+    """
+
+    def __init__(self, name: str, window: int = 20, min_calls: int = 5, failure_rate: float = 0.5, slow_call_seconds: float = 15.0, open_seconds: float = 30.0):
+        self.name = name
+        self.min_calls = max(1, min_calls)
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self._outcomes: Deque[bool] = deque(maxlen=max(self.min_calls, window))
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.rejected = 0
+
+    def retry_after(self) -> float:
+        return max(0.0, self._opened_at + self.open_seconds - time.monotonic())
+
+    def check(self):
+        """Raises CircuitOpenError while the circuit is open, without claiming a probe."""
+        with self._lock:
+            if self.state == OPEN and self.retry_after() > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, self.retry_after())
+
+    def before_call(self):
+        """
+        Call before each upstream call. Raises CircuitOpenError if the call
+        may not go ahead; otherwise the caller must report the outcome with
+        `record` (or `cancel` if the call never reached the upstream).
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            if self.state == OPEN:
+                if self.retry_after() > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, self.retry_after())
+                self.state = HALF_OPEN
+            if self._probing:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, 1.0)
+            self._probing = True
+
+    def record(self, success: bool, duration: float = 0.0):
+        failed = not success or duration >= self.slow_call_seconds
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+                if failed:
+                    self._open()
+                else:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                return
+
+            self._outcomes.append(failed)
+            if len(self._outcomes) >= self.min_calls and sum(self._outcomes) / len(self._outcomes) >= self.failure_rate:
+                self._open()
+
+    def cancel(self):
+        with self._lock:
+            self._probing = False
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.opened += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self.state
+            if state == OPEN and self.retry_after() <= 0:
+                state = HALF_OPEN
+            return {
+                "state": state,
+                "retry_after": round(self.retry_after(), 1) if state == OPEN else 0,
+                "recent_calls": len(self._outcomes),
+                "recent_failures": sum(self._outcomes),
+                "opened": self.opened,
+                "rejected": self.rejected,
+            }
+
+
+class CircuitBreakers():
+    """
+    One CircuitBreaker per source. Thresholds come from CIRCUIT_WINDOW,
+    CIRCUIT_MIN_CALLS, CIRCUIT_FAILURE_RATE, CIRCUIT_SLOW_CALL_SECONDS and
+    CIRCUIT_OPEN_SECONDS, each overridable per source.
+    """
+
+    def __init__(self, sources: Iterable[str]):
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        for source in sources:
+            self.breakers[source] = CircuitBreaker(
+                source,
+                window=source_env_int("CIRCUIT_WINDOW", source, 20),
+                min_calls=source_env_int("CIRCUIT_MIN_CALLS", source, 5),
+                failure_rate=source_env_float("CIRCUIT_FAILURE_RATE", source, 0.5),
+                slow_call_seconds=source_env_float("CIRCUIT_SLOW_CALL_SECONDS", source, 15.0),
+                open_seconds=source_env_float("CIRCUIT_OPEN_SECONDS", source, 30.0),
+            )
+
+    def get(self, source: str) -> Optional[CircuitBreaker]:
+        return self.breakers.get(source.lower())
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {source: breaker.stats() for source, breaker in self.breakers.items()}
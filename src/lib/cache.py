@@ -0,0 +1,364 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from src.lib.config import env_bool, env_int, env_str, private_data_dir, restrict_file
+from src.lib.types import Chapter, ChapterRecord, Manga
+
+# Default TTLs in seconds per scraper operation. Anything not listed is not
+# cached. Override with CACHE_TTL_<OPERATION>, e.g. CACHE_TTL_LATEST_MANGA=60.
+DEFAULT_TTLS = {
+    "latest_manga": 120,
+    "popular_manga": 900,
+    "search_manga": 900,
+    "get_chapter": 7 * 24 * 3600,
+    "get_chapter_list": 900,
+}
+
+# How long past its TTL an entry may still be served while it is refreshed
+# in the background (stale-while-revalidate). Override with
+# CACHE_STALE_TTL_<OPERATION>; 0 turns it off for that operation.
+DEFAULT_STALE_TTLS = {
+    "latest_manga": 24 * 3600,
+    "popular_manga": 24 * 3600,
+}
+
+
+def cache_ttl(operation: str) -> int:
+    return env_int(f"CACHE_TTL_{operation.upper()}", DEFAULT_TTLS.get(operation, 0))
+
+
+def cache_stale_ttl(operation: str) -> int:
+    return env_int(f"CACHE_STALE_TTL_{operation.upper()}", DEFAULT_STALE_TTLS.get(operation, 0))
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in sorted(value.items())}
+    return value
+
+
+def make_key(source: str, operation: str, args: tuple = (), kwargs: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Builds a stable cache key from a scraper call. Whitespace in string
+    arguments is collapsed and free-text search queries are case-folded, so
+    "One  Piece" and "one piece" share an entry. IDs keep their case, including
+    "id:<id>" lookups made through search (Comick hids are case-sensitive).
+    """
+    args = _normalize(list(args))
+    if operation.startswith("search") and args and isinstance(args[0], str) and not args[0].casefold().startswith("id:"):
+        args[0] = args[0].casefold()
+    payload = json.dumps([args, _normalize(kwargs or {})], separators=(",", ":"), default=str)
+    return f"{source.lower()}:{operation}:{payload}"
+
+
+class LRUCache():
+    """
+    A thread-safe, size-bounded in-memory cache with per-entry TTLs. The least
+    recently used entry is evicted once `max_entries` is reached.
+
+    Entries can outlive their TTL by a stale window; they are only returned
+    past expiry when the caller asks for stale values.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max(1, max_entries)
+        self._data: "OrderedDict[str, Tuple[Any, float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get_with_expiry(self, key: str, allow_stale: bool = False) -> Optional[Tuple[Any, float, float]]:
+        """Returns (value, expires_at, stale_until) or None."""
+        now = time.time()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            if item[2] <= now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            if item[1] <= now and not allow_stale:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item
+
+    def get(self, key: str) -> Any:
+        item = self.get_with_expiry(key)
+        return item[0] if item is not None else None
+
+    def set(self, key: str, value: Any, ttl: float, expires_at: Optional[float] = None, stale_until: Optional[float] = None):
+        expires_at = expires_at if expires_at is not None else time.time() + ttl
+        stale_until = max(expires_at, stale_until or 0)
+        with self._lock:
+            self._data[key] = (value, expires_at, stale_until)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+# Result types the disk tier can rebuild. Anything else is stored as plain
+# JSON; nothing read back from disk is ever executed or imported.
+_SERIALIZABLE = {cls.__name__: cls for cls in (Manga, Chapter, ChapterRecord)}
+_TYPE_KEY = "__cache_type__"
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, (list, tuple)):
+        return [_to_json(item) for item in value]
+    if isinstance(value, dict):
+        return {str(k): _to_json(v) for k, v in value.items()}
+    if _SERIALIZABLE.get(type(value).__name__) is type(value):
+        return {_TYPE_KEY: type(value).__name__, "fields": _to_json(vars(value))}
+    return value
+
+
+def _from_json(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_from_json(item) for item in value]
+    if isinstance(value, dict):
+        cls = _SERIALIZABLE.get(value.get(_TYPE_KEY))
+        if cls is not None:
+            obj = cls.__new__(cls)
+            obj.__dict__.update(_from_json(value["fields"]))
+            return obj
+        return {k: _from_json(v) for k, v in value.items()}
+    return value
+
+
+def serialize(value: Any) -> str:
+    return json.dumps(_to_json(value), separators=(",", ":"), default=str)
+
+
+def deserialize(data: str) -> Any:
+    return _from_json(json.loads(data))
+
+
+class SQLiteStore():
+    """
+    On-disk cache tier. Values are stored as JSON in a single table keyed by
+    the cache key, and scraper results (Manga, Chapter, ChapterRecord) are
+    rebuilt from their attributes on read. Safe to share between worker
+    processes: SQLite serialises the writers and WAL mode lets readers run
+    alongside them.
+
+    Every method blocks on SQLite; async code goes through TieredCache's
+    *_async methods, which run them on a thread.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        restrict_file(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # Older versions pickled values into a "cache" table; that table is
+        # never read again.
+        self._conn.execute("DROP TABLE IF EXISTS cache")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, stale_until REAL NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_stale_until ON entries (stale_until)")
+
+    def get_with_expiry(self, key: str, allow_stale: bool = False) -> Optional[Tuple[Any, float, float]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at, stale_until FROM entries WHERE key = ? AND stale_until > ?", (key, now)
+            ).fetchone()
+            if row is None or (row[1] <= now and not allow_stale):
+                self.misses += 1
+                return None
+            self.hits += 1
+        return deserialize(row[0]), row[1], row[2]
+
+    def set(self, key: str, value: Any, expires_at: float, stale_until: Optional[float] = None):
+        data = serialize(value)
+        stale_until = max(expires_at, stale_until or 0)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires_at, stale_until) VALUES (?, ?, ?, ?)",
+                (key, data, expires_at, stale_until)
+            )
+            self._writes += 1
+            if self._writes % 100 == 0:
+                self._prune()
+
+    def _prune(self):
+        # Called with the lock held. Drops rows past their stale window, then
+        # the rows closest to it if the table is still over its size limit.
+        self._conn.execute("DELETE FROM entries WHERE stale_until <= ?", (time.time(),))
+        count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY stale_until LIMIT ?)", (excess,)
+            )
+            self.evictions += excess
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            return {
+                "path": self.path,
+                "entries": count,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class TieredCache():
+    """
+    Memory LRU in front of an optional SQLite store. Disk hits are promoted
+    into memory with their remaining TTL.
+
+    The *_async methods answer memory hits inline and run the disk tier on a
+    thread, so a slow or locked SQLite file never stalls the event loop.
+    """
+
+    def __init__(self, memory: LRUCache, disk: Optional[SQLiteStore] = None):
+        self.memory = memory
+        self.disk = disk
+
+    def _read_disk(self, key: str, allow_stale: bool) -> Optional[Tuple[Any, float, float]]:
+        try:
+            item = self.disk.get_with_expiry(key, allow_stale)
+        except Exception as e:
+            print(f"Cache read failed for {key}: {e}")
+            return None
+        if item is not None:
+            self.memory.set(key, item[0], 0, expires_at=item[1], stale_until=item[2])
+        return item
+
+    def _write_disk(self, key: str, value: Any, expires_at: float, stale_until: float):
+        try:
+            self.disk.set(key, value, expires_at, stale_until)
+        except Exception as e:
+            print(f"Cache write failed for {key}: {e}")
+
+    @staticmethod
+    def _entry(item: Optional[Tuple[Any, float, float]]) -> Optional[Tuple[Any, bool]]:
+        if item is None:
+            return None
+        value, expires_at, _ = item
+        return value, expires_at > time.time()
+
+    def get_entry(self, key: str, allow_stale: bool = False) -> Optional[Tuple[Any, bool]]:
+        """
+        Returns (value, fresh) or None. With `allow_stale`, entries past their
+        TTL but inside their stale window come back with fresh=False.
+        """
+        item = self.memory.get_with_expiry(key, allow_stale)
+        if item is None and self.disk is not None:
+            item = self._read_disk(key, allow_stale)
+        return self._entry(item)
+
+    async def get_entry_async(self, key: str, allow_stale: bool = False) -> Optional[Tuple[Any, bool]]:
+        item = self.memory.get_with_expiry(key, allow_stale)
+        if item is None and self.disk is not None:
+            item = await asyncio.to_thread(self._read_disk, key, allow_stale)
+        return self._entry(item)
+
+    def get(self, key: str) -> Any:
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def set(self, key: str, value: Any, ttl: float, stale_ttl: float = 0):
+        expires_at = time.time() + ttl
+        stale_until = expires_at + stale_ttl
+        self.memory.set(key, value, ttl, expires_at=expires_at, stale_until=stale_until)
+        if self.disk is not None:
+            self._write_disk(key, value, expires_at, stale_until)
+
+    async def set_async(self, key: str, value: Any, ttl: float, stale_ttl: float = 0):
+        expires_at = time.time() + ttl
+        stale_until = expires_at + stale_ttl
+        self.memory.set(key, value, ttl, expires_at=expires_at, stale_until=stale_until)
+        if self.disk is not None:
+            await asyncio.to_thread(self._write_disk, key, value, expires_at, stale_until)
+
+    def delete(self, key: str):
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        memory = self.memory.stats()
+        disk = self.disk.stats() if self.disk is not None else None
+        return {
+            "hits": memory["hits"] + (disk["hits"] if disk else 0),
+            "misses": disk["misses"] if disk else memory["misses"],
+            "evictions": memory["evictions"] + (disk["evictions"] if disk else 0),
+            "memory": memory,
+            "disk": disk,
+        }
+
+
+def create_cache() -> TieredCache:
+    """
+    Builds the response cache from CACHE_* settings. The disk tier defaults to
+    a file in a private per-user directory under the temp directory, the only
+    writable location on serverless hosts; set CACHE_DISK=0 to keep
+    everything in memory.
+    """
+    memory = LRUCache(env_int("CACHE_MAX_ENTRIES", 1024))
+    disk = None
+    if env_bool("CACHE_DISK", True):
+        path = env_str("CACHE_DB_PATH")
+        try:
+            path = path or os.path.join(private_data_dir(), "cache.sqlite3")
+            disk = SQLiteStore(path, env_int("CACHE_DISK_MAX_ENTRIES", 10000))
+        except Exception as e:
+            print(f"Disk cache disabled, could not open {path or 'the default cache file'}: {e}")
+    return TieredCache(memory, disk)
@@ -0,0 +1,149 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from src.lib.config import env_bool, env_int, env_str, private_data_dir, restrict_file
+
+
+class ClearanceStore():
+    """
+    Persists each source's session cookies (including Cloudflare's
+    cf_clearance) and the User-Agent sent with the request that received
+    them, so a new process can reuse a solved challenge instead of solving
+    it again.
+
+    Safe to share between worker processes: each save replaces a source's
+    rows in one transaction, and WAL mode lets readers run alongside it.
+    Cookies without an expiry are kept for `session_ttl` seconds.
+    """
+
+    def __init__(self, path: str, session_ttl: int = 1800):
+        self.path = path
+        self.session_ttl = session_ttl
+        self._lock = threading.Lock()
+        # Last cookie set seen per source, so unchanged jars aren't rewritten.
+        self._fingerprints: Dict[str, frozenset] = {}
+        self.loads = 0
+        self.saves = 0
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        # The file holds live session cookies; keep it readable by us alone.
+        restrict_file(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cookies (source TEXT NOT NULL, domain TEXT NOT NULL, path TEXT NOT NULL, name TEXT NOT NULL, "
+            "value TEXT NOT NULL, secure INTEGER NOT NULL, expires REAL NOT NULL, PRIMARY KEY (source, domain, path, name))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS agents (source TEXT PRIMARY KEY, user_agent TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def _fingerprint(self, session) -> frozenset:
+        now = time.time()
+        return frozenset(
+            (cookie.domain, cookie.path, cookie.name, cookie.value, cookie.secure, cookie.expires)
+            for cookie in list(session.cookies)
+            if cookie.value is not None and (cookie.expires is None or cookie.expires > now)
+        )
+
+    def load(self, source: str, session) -> int:
+        """Adds the source's unexpired cookies to `session` and returns how many."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT domain, path, name, value, secure, expires FROM cookies WHERE source = ? AND expires > ?",
+                (source, time.time())
+            ).fetchall()
+            agent = self._conn.execute("SELECT user_agent FROM agents WHERE source = ?", (source,)).fetchone()
+
+        for domain, path, name, value, secure, expires in rows:
+            session.cookies.set(name, value, domain=domain, path=path, secure=bool(secure), expires=int(expires))
+        # cf_clearance is only honoured for the User-Agent that earned it.
+        # Requests that set their own User-Agent header still override this.
+        if rows and agent:
+            session.headers["User-Agent"] = agent[0]
+
+        self._fingerprints[source] = self._fingerprint(session)
+        if rows:
+            self.loads += 1
+        return len(rows)
+
+    def save(self, source: str, session, user_agent: Optional[str] = None) -> bool:
+        """
+        Writes the session's cookies if they changed since the last load or
+        save. `user_agent` is the one actually sent; the session's own header
+        is used when it isn't given.
+        """
+        try:
+            fingerprint = self._fingerprint(session)
+        except RuntimeError:
+            # The jar changed under us on another thread; the next call will catch up.
+            return False
+        if not fingerprint or fingerprint == self._fingerprints.get(source):
+            return False
+
+        now = time.time()
+        rows = [
+            (source, domain, path, name, value, int(secure), expires if expires is not None else now + self.session_ttl)
+            for domain, path, name, value, secure, expires in fingerprint
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM cookies WHERE source = ? OR expires <= ?", (source, now))
+                self._conn.executemany("INSERT OR REPLACE INTO cookies VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                user_agent = user_agent or session.headers.get("User-Agent")
+                if user_agent:
+                    self._conn.execute("INSERT OR REPLACE INTO agents VALUES (?, ?, ?)", (source, user_agent, now))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._fingerprints[source] = fingerprint
+            self.saves += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT source, COUNT(*), MIN(expires) FROM cookies WHERE expires > ? GROUP BY source", (time.time(),)
+            ).fetchall()
+        return {
+            "path": self.path,
+            "loads": self.loads,
+            "saves": self.saves,
+            "sources": {
+                source: {"cookies": count, "expires_in": round(expires - time.time())}
+                for source, count, expires in rows
+            },
+        }
+
+
+_store: Optional[ClearanceStore] = None
+_store_lock = threading.Lock()
+_store_failed = False
+
+
+def get_clearance_store() -> Optional[ClearanceStore]:
+    """
+    Returns the process-wide store, opening it on first use. Like the disk
+    cache it lives in the private per-user data directory by default; set
+    CLEARANCE_STORE=0 to keep cookies in memory only.
+    """
+    global _store, _store_failed
+    if _store is not None or _store_failed:
+        return _store
+    with _store_lock:
+        if _store is None and not _store_failed:
+            if not env_bool("CLEARANCE_STORE", True):
+                _store_failed = True
+                return None
+            path = env_str("CLEARANCE_DB_PATH")
+            try:
+                path = path or os.path.join(private_data_dir(), "clearance.sqlite3")
+                _store = ClearanceStore(path, env_int("CLEARANCE_SESSION_TTL", 1800))
+            except Exception as e:
+                print(f"Clearance store disabled, could not open {path or 'the default clearance file'}: {e}")
+                _store_failed = True
+    return _store
@@ -0,0 +1,81 @@
+import os
+import re
+import stat
+import tempfile
+from typing import Optional
+
+
+def _source_suffix(source: str) -> str:
+    return re.sub(r"[^A-Z0-9]+", "_", source.upper()).strip("_")
+
+
+def env_str(name: str, default: Optional[str] = None) -> Optional[str]:
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip()
+
+
+def env_int(name: str, default: int) -> int:
+    value = env_str(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        print(f"Ignoring invalid integer for {name}: {value!r}")
+        return default
+
+
+def env_float(name: str, default: float) -> float:
+    value = env_str(name)
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        print(f"Ignoring invalid number for {name}: {value!r}")
+        return default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    value = env_str(name)
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+def private_data_dir(name: str = "animirai") -> str:
+    """
+    Returns a per-user directory in the temp dir for on-disk state, creating
+    it with 0700 permissions. The temp dir is shared with every local user,
+    so a directory that already exists but isn't a private directory owned
+    by us (e.g. one planted by someone else) raises PermissionError.
+    """
+    uid = os.getuid() if hasattr(os, "getuid") else None
+    directory = os.path.join(tempfile.gettempdir(), f"{name}-{uid}" if uid is not None else name)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    if uid is not None:
+        info = os.lstat(directory)
+        if not stat.S_ISDIR(info.st_mode) or info.st_uid != uid or info.st_mode & 0o077:
+            raise PermissionError(f"{directory} is not a private directory owned by this user")
+    return directory
+
+
+def restrict_file(path: str):
+    """Makes `path` readable and writable by its owner only, if it exists."""
+    try:
+        os.chmod(path, 0o600)
+    except OSError:
+        pass
+
+
+def source_env_int(name: str, source: str, default: int) -> int:
+    """
+    Reads `NAME_<SOURCE>` first (e.g. SCRAPER_POOL_SIZE_TOONILY), then `NAME`.
+    """
+    return env_int(f"{name}_{_source_suffix(source)}", env_int(name, default))
+
+
+def source_env_float(name: str, source: str, default: float) -> float:
+    return env_float(f"{name}_{_source_suffix(source)}", env_float(name, default))
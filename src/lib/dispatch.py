@@ -0,0 +1,217 @@
+import asyncio
+import inspect
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Optional
+
+from src.lib.config import source_env_int
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_QUEUE_LIMIT = 16
+DEFAULT_ASYNC_LIMIT = 1000
+
+_ITEM = "item"
+_ERROR = "error"
+_DONE = "done"
+
+
+class SourceBusyError(Exception):
+    """Raised when a source already has as many calls running and queued as it accepts."""
+
+    def __init__(self, source: str):
+        super().__init__(f"Source '{source}' is busy, try again later")
+        self.source = source
+
+
+class SourcePool:
+    """
+    A bounded thread pool for one source. At most `max_workers` calls run at
+    once and at most `queue_limit` more wait for a worker; anything beyond that
+    is rejected with SourceBusyError instead of piling up.
+
+    Coroutine functions (from AsyncScraper sources) skip the threads and are
+    awaited directly, bounded by `async_limit` concurrent calls.
+    """
+
+    def __init__(self, name: str, max_workers: int, queue_limit: int, async_limit: int = DEFAULT_ASYNC_LIMIT):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.queue_limit = max(0, queue_limit)
+        self.async_limit = max(1, async_limit)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"scraper-{name}")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._async_pending = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def _acquire(self):
+        with self._lock:
+            if self._pending >= self.max_workers + self.queue_limit:
+                self._rejected += 1
+                raise SourceBusyError(self.name)
+            self._pending += 1
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._pending -= 1
+            self._completed += 1
+
+    async def _run_coroutine(self, func: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            if self._async_pending >= self.async_limit:
+                self._rejected += 1
+                raise SourceBusyError(self.name)
+            self._async_pending += 1
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._async_pending -= 1
+                self._completed += 1
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        if inspect.iscoroutinefunction(func):
+            return await self._run_coroutine(func, *args, **kwargs)
+
+        self._acquire()
+        try:
+            future = self.executor.submit(func, *args, **kwargs)
+        except BaseException:
+            self._release()
+            raise
+        # The slot is released when the work itself finishes, not when the
+        # caller stops waiting, so abandoned calls still count against the pool.
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def stream(self, func: Callable, *args, **kwargs) -> AsyncIterator:
+        """
+        Runs a generator function and returns an async iterator over its items.
+        Admission is checked up front, so a busy source raises SourceBusyError
+        here rather than partway through a response.
+        """
+        if inspect.isasyncgenfunction(func):
+            with self._lock:
+                if self._async_pending >= self.async_limit:
+                    self._rejected += 1
+                    raise SourceBusyError(self.name)
+            return self._stream_async(func, *args, **kwargs)
+
+        self._acquire()
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+
+        def put(kind, value=None):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, (kind, value))
+            except RuntimeError:
+                # The event loop is gone; nobody is listening any more.
+                stop.set()
+
+        def produce():
+            try:
+                for item in func(*args, **kwargs):
+                    put(_ITEM, item)
+                    if stop.is_set():
+                        break
+            except BaseException as e:
+                put(_ERROR, e)
+            finally:
+                put(_DONE)
+
+        try:
+            future = self.executor.submit(produce)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return self._drain(queue, stop)
+
+    async def _drain(self, queue: asyncio.Queue, stop: threading.Event) -> AsyncIterator:
+        try:
+            while True:
+                kind, value = await queue.get()
+                if kind == _DONE:
+                    return
+                if kind == _ERROR:
+                    raise value
+                yield value
+        finally:
+            # Lets the worker thread stop early if the client went away.
+            stop.set()
+
+    async def _stream_async(self, func: Callable, *args, **kwargs) -> AsyncIterator:
+        with self._lock:
+            self._async_pending += 1
+        try:
+            async for item in func(*args, **kwargs):
+                yield item
+        finally:
+            with self._lock:
+                self._async_pending -= 1
+                self._completed += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            pending = self._pending
+            return {
+                "workers": self.max_workers,
+                "queue_limit": self.queue_limit,
+                "running": min(pending, self.max_workers),
+                "queued": max(0, pending - self.max_workers),
+                "async_running": self._async_pending,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+
+class Dispatcher:
+    """
+    Runs blocking scraper calls off the event loop, with one SourcePool per source.
+
+    Pool sizes come from SCRAPER_POOL_SIZE / SCRAPER_QUEUE_LIMIT /
+    SCRAPER_ASYNC_LIMIT and can be overridden per source, e.g.
+    SCRAPER_POOL_SIZE_TOONILY=2.
+    """
+
+    def __init__(self, sources: Iterable[str] = (), max_workers: Optional[int] = None, queue_limit: Optional[int] = None):
+        self.max_workers = max_workers
+        self.queue_limit = queue_limit
+        self.pools: Dict[str, SourcePool] = {}
+        self._lock = threading.Lock()
+        for source in sources:
+            self.pool(source)
+
+    def pool(self, source: str) -> SourcePool:
+        key = source.lower()
+        with self._lock:
+            pool = self.pools.get(key)
+            if pool is None:
+                max_workers = self.max_workers or source_env_int("SCRAPER_POOL_SIZE", key, DEFAULT_POOL_SIZE)
+                queue_limit = self.queue_limit if self.queue_limit is not None else source_env_int("SCRAPER_QUEUE_LIMIT", key, DEFAULT_QUEUE_LIMIT)
+                async_limit = source_env_int("SCRAPER_ASYNC_LIMIT", key, DEFAULT_ASYNC_LIMIT)
+                pool = SourcePool(key, max_workers, queue_limit, async_limit)
+                self.pools[key] = pool
+            return pool
+
+    async def run(self, source: str, func: Callable, *args, **kwargs) -> Any:
+        return await self.pool(source).run(func, *args, **kwargs)
+
+    def stream(self, source: str, func: Callable, *args, **kwargs) -> AsyncIterator:
+        return self.pool(source).stream(func, *args, **kwargs)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            pools = list(self.pools.values())
+        return {pool.name: pool.stats() for pool in pools}
+
+    def shutdown(self):
+        with self._lock:
+            pools = list(self.pools.values())
+        for pool in pools:
+            pool.shutdown()
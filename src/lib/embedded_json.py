@@ -0,0 +1,78 @@
+import json
+import re
+from typing import Any, Optional
+
+# JavaScript escapes that JSON strings don't have: \xHH, \' and \0. An
+# escaped backslash is matched too, so "\\x41" stays a backslash and "x41".
+_JS_ONLY_ESCAPES = re.compile(r"\\(\\|x([0-9a-fA-F]{2})|'|0(?![0-9]))")
+
+
+def _to_json_escape(match: "re.Match") -> str:
+    if match.group(1) == "\\":
+        return "\\\\"
+    if match.group(2):
+        return "\\u00" + match.group(2)
+    if match.group(1) == "'":
+        return "'"
+    return "\\u0000"
+
+
+def find_string_literal(text: str, marker: str, start: int = 0) -> Optional[str]:
+    """
+    Returns the raw body of the first JS string literal following `marker`
+    in `text` (escapes left as they are), or None. Only the literal is
+    scanned, so the cost doesn't depend on what else the page holds.
+    """
+    index = text.find(marker, start)
+    if index < 0:
+        return None
+    index += len(marker)
+    length = len(text)
+    while index < length and text[index].isspace():
+        index += 1
+    if index >= length or text[index] not in "\"'":
+        return None
+
+    quote = text[index]
+    body_start = index + 1
+    end = body_start
+    while True:
+        end = text.find(quote, end)
+        if end < 0:
+            return None
+        # The quote is escaped if an odd number of backslashes precede it.
+        backslashes = 0
+        while text[end - 1 - backslashes] == "\\":
+            backslashes += 1
+        if backslashes % 2 == 0:
+            return text[body_start:end]
+        end += 1
+
+
+def decode_string_literal(body: str) -> str:
+    """
+    Decodes the body of a JS string literal. Its escapes are a superset of
+    JSON's, so after rewriting the few JS-only ones (rare in practice) the
+    whole string is decoded in a single pass by the C JSON scanner.
+    """
+    if "\\x" in body or "\\'" in body or "\\0" in body:
+        body = _JS_ONLY_ESCAPES.sub(_to_json_escape, body)
+    # Bare double quotes can only appear in single-quoted literals.
+    if '"' in body:
+        body = re.sub(r'(?<!\\)((?:\\\\)*)"', r'\1\\"', body)
+    return json.loads(f'"{body}"')
+
+
+def extract_json_parse(text: str, start: int = 0) -> Optional[Any]:
+    """
+    Finds the first `JSON.parse("...")` call in a page and returns the
+    value it would produce, without building a DOM. Returns None if there
+    is no such call or its argument isn't valid JSON.
+    """
+    body = find_string_literal(text, "JSON.parse(", start)
+    if body is None:
+        return None
+    try:
+        return json.loads(decode_string_literal(body))
+    except ValueError:
+        return None
@@ -0,0 +1,141 @@
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from src.lib.config import env_str
+
+# What the HTML scrapers get back from parse_html: a BeautifulSoup tree, or
+# a SelectolaxNode that offers the same subset of its API.
+Node = Any
+
+# Backends tried in order when HTML_PARSER is "auto" (the default).
+AUTO_ORDER = ("lxml", "html.parser")
+PARSERS = ("selectolax", "lxml", "html.parser")
+
+
+class SelectolaxNode():
+    """
+    Wraps a selectolax node in the parts of the BeautifulSoup API the
+    scrapers use: select, select_one, get, text and string. Selectors are
+    the same CSS strings; ones using the BeautifulSoup-only `:contains`
+    pseudo-class are run against a BeautifulSoup copy of the node instead.
+    """
+
+    __slots__ = ("node", "_soup")
+
+    def __init__(self, node):
+        self.node = node
+        self._soup = None
+
+    def _fallback(self):
+        if self._soup is None:
+            from bs4 import BeautifulSoup
+            self._soup = BeautifulSoup(self.node.html or "", "html.parser")
+        return self._soup
+
+    def select(self, selector: str) -> List[Node]:
+        if ":contains(" in selector:
+            return self._fallback().select(selector)
+        return [SelectolaxNode(node) for node in self.node.css(selector)]
+
+    def select_one(self, selector: str) -> Optional[Node]:
+        if ":contains(" in selector:
+            return self._fallback().select_one(selector)
+        node = self.node.css_first(selector)
+        return SelectolaxNode(node) if node is not None else None
+
+    def get(self, name: str, default: Any = None) -> Any:
+        value = self.node.attributes.get(name)
+        return default if value is None else value
+
+    def get_text(self, separator: str = "", strip: bool = False) -> str:
+        return self.node.text(deep=True, separator=separator, strip=strip)
+
+    @property
+    def text(self) -> str:
+        return self.node.text(deep=True)
+
+    @property
+    def string(self) -> Optional[str]:
+        # Like BeautifulSoup, only defined when the node holds nothing but text.
+        if any(child.tag != "-text" for child in self.node.iter(include_text=True)):
+            return None
+        return self.node.text(deep=True)
+
+    @property
+    def name(self) -> str:
+        return self.node.tag
+
+
+class ParseOnly():
+    """
+    Limits parsing to the elements a list extractor reads, like bs4's
+    SoupStrainer: only tags named `name` (one or several) whose attributes
+    match `attrs` are built, each with its full subtree. Everything else on
+    the page (scripts, navigation, footers) is skipped by the tree builder.
+
+    Attribute values may be a string, a list of alternatives, or a compiled
+    regex; `class_` matches any one of an element's classes.
+    """
+
+    def __init__(self, name: Union[str, Sequence[str]], **attrs: Any):
+        self.name = name if isinstance(name, str) else list(name)
+        self.attrs: Dict[str, Any] = {key.rstrip("_"): value for key, value in attrs.items()}
+        self._strainer = None
+
+    def soup_strainer(self):
+        if self._strainer is None:
+            from bs4 import SoupStrainer
+            self._strainer = SoupStrainer(self.name, attrs=self.attrs)
+        return self._strainer
+
+
+def _available(parser: str) -> bool:
+    module = {"selectolax": "selectolax.lexbor", "lxml": "lxml"}.get(parser)
+    if module is None:
+        return True
+    try:
+        __import__(module)
+    except ImportError:
+        return False
+    return True
+
+
+def available_parsers() -> List[str]:
+    return [parser for parser in PARSERS if _available(parser)]
+
+
+_default_parser: Optional[str] = None
+
+
+def default_parser() -> str:
+    """
+    The backend named by HTML_PARSER (selectolax, lxml or html.parser), or
+    the fastest installed BeautifulSoup backend when it is unset or "auto".
+    """
+    global _default_parser
+    if _default_parser is None:
+        wanted = (env_str("HTML_PARSER", "auto") or "auto").lower()
+        if wanted != "auto" and wanted not in PARSERS:
+            print(f"Ignoring unknown HTML_PARSER {wanted!r}")
+            wanted = "auto"
+        if wanted != "auto" and not _available(wanted):
+            print(f"HTML_PARSER {wanted!r} is not installed, falling back")
+            wanted = "auto"
+        if wanted == "auto":
+            wanted = next(parser for parser in AUTO_ORDER if _available(parser))
+        _default_parser = wanted
+    return _default_parser
+
+
+def parse_html(markup: str, parser: Optional[str] = None, only: Optional[ParseOnly] = None) -> Node:
+    """
+    Parses a page (or fragment) with the configured backend. With `only`,
+    BeautifulSoup backends build just the matching elements; selectolax
+    builds its tree in C either way, so it always parses the whole page.
+    """
+    parser = parser or default_parser()
+    if parser == "selectolax":
+        from selectolax.lexbor import LexborHTMLParser
+        return SelectolaxNode(LexborHTMLParser(markup).root)
+
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(markup, parser, parse_only=only.soup_strainer() if only is not None else None)
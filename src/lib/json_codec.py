@@ -0,0 +1,104 @@
+import json
+from functools import lru_cache
+from typing import Any, Dict, Optional, Union
+
+from src.lib.config import env_str
+
+# Codecs tried in order when JSON_CODEC is "auto" (the default).
+CODECS = ("orjson", "msgspec", "json")
+
+
+@lru_cache(maxsize=None)
+def _available(codec: str) -> bool:
+    if codec == "json":
+        return True
+    try:
+        __import__(codec)
+    except ImportError:
+        return False
+    return True
+
+
+_codec: Optional[str] = None
+
+
+def codec_name() -> str:
+    """The codec named by JSON_CODEC, or the fastest one installed."""
+    global _codec
+    if _codec is None:
+        wanted = (env_str("JSON_CODEC", "auto") or "auto").lower()
+        if wanted != "auto" and wanted not in CODECS:
+            print(f"Ignoring unknown JSON_CODEC {wanted!r}")
+            wanted = "auto"
+        if wanted != "auto" and not _available(wanted):
+            print(f"JSON_CODEC {wanted!r} is not installed, falling back")
+            wanted = "auto"
+        if wanted == "auto":
+            wanted = next(codec for codec in CODECS if _available(codec))
+        _codec = wanted
+    return _codec
+
+
+def loads(data: Union[bytes, str], codec: Optional[str] = None) -> Any:
+    """Decodes a JSON document. Raises ValueError whichever codec is used."""
+    codec = codec or codec_name()
+    if codec == "orjson":
+        import orjson
+        return orjson.loads(data)
+    if codec == "msgspec":
+        import msgspec
+        try:
+            return msgspec.json.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+    return json.loads(data)
+
+
+_decoders: Dict[Any, Any] = {}
+
+
+def decode(data: Union[bytes, str], schema: Any = None, codec: Optional[str] = None) -> Any:
+    """
+    Like `loads`, but with a `schema` (a TypedDict describing the fields the
+    caller reads) and msgspec installed, decodes straight into that shape:
+    fields not in the schema are skipped instead of being built. The result
+    is still plain dicts and lists. Falls back to a full decode when msgspec
+    is missing or the document doesn't fit the schema.
+    """
+    # Typed decoding is msgspec's alone, so it is used unless another codec
+    # was asked for explicitly.
+    requested = codec or (env_str("JSON_CODEC", "auto") or "auto").lower()
+    if schema is not None and requested in ("auto", "msgspec") and _available("msgspec"):
+        import msgspec
+        decoder = _decoders.get(schema)
+        if decoder is None:
+            decoder = _decoders[schema] = msgspec.json.Decoder(schema)
+        try:
+            return decoder.decode(data)
+        except msgspec.ValidationError:
+            pass
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+    return loads(data, codec)
+
+
+def _default(value: Any) -> Any:
+    # Scrapers occasionally hand back sets or other non-JSON values; encode
+    # them the way FastAPI's jsonable_encoder would rather than failing.
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if hasattr(value, "get") and callable(value.get):
+        return value.get()
+    return str(value)
+
+
+def dumps(value: Any, codec: Optional[str] = None) -> bytes:
+    """Encodes `value` as compact UTF-8 JSON."""
+    codec = codec or codec_name()
+    if codec == "orjson":
+        import orjson
+        return orjson.dumps(value, default=_default)
+    if codec == "msgspec":
+        import msgspec
+        return msgspec.json.encode(value, enc_hook=_default)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
@@ -0,0 +1,372 @@
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Deque, Dict, Optional
+from urllib.parse import urlsplit
+
+from src.lib.breaker import note_wait
+from src.lib.config import env_float, source_env_float, source_env_int
+
+# requests and httpx are imported on first use, like in async_http, so the
+# wrappers below cost nothing for processes that never build them.
+
+# Responses that mean "slow down". They halve the host's concurrency window
+# and pause it for Retry-After (or the default backoff).
+THROTTLE_STATUSES = (429, 503)
+
+# Built-in limits for hosts the defaults would throttle on the API's own
+# default paths. A Toonily listing with chapters is 1 + 2 requests per
+# series (about 41 a page) spread over TOONILY_CHAPTER_WORKERS=8 threads, so
+# the bucket holds a full page and the window fits every worker.
+HOST_DEFAULTS: Dict[str, Dict[str, float]] = {
+    "toonily.com": {"rps": 20.0, "burst": 45, "window": 10},
+}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parses a Retry-After header (seconds or HTTP date) into seconds."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimitTimeout(TimeoutError):
+    """Raised when a request can't get a slot for its host within its timeout."""
+
+    def __init__(self, host: str, retry_after: float):
+        super().__init__(f"Rate limit for '{host}' not cleared in time, retry in {math.ceil(retry_after)}s")
+        self.host = host
+        self.retry_after = retry_after
+
+
+class _Ticket():
+    __slots__ = ("event", "loop", "future")
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.event = threading.Event() if loop is None else None
+        self.loop = loop
+        self.future: Optional[asyncio.Future] = None
+
+    def wake(self):
+        if self.event is not None:
+            self.event.set()
+        elif self.future is not None:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class HostLimiter():
+    """
+    Throttles requests to one host with a token bucket (`rate` requests per
+    second, bursts of up to `burst`) and an AIMD concurrency window: each
+    successful response grows the window by about one per window's worth of
+    requests, and each 429/503 halves it and pauses the host (for at most
+    `max_pause` seconds, whatever Retry-After asks for).
+
+    Waiting requests are served strictly in arrival order, from threads and
+    from event loops alike, so one busy caller can't starve the rest.
+    """
+
+    def __init__(self, host: str, rate: float = 5.0, burst: int = 10, window: int = 4, max_window: int = 32, backoff: float = 1.0, max_pause: float = 60.0):
+        self.host = host
+        self.rate = max(0.001, rate)
+        self.burst = max(1, burst)
+        self.min_window = 1.0
+        self.max_window = float(max(1, max_window))
+        self.window = min(float(max(1, window)), self.max_window)
+        self.backoff = backoff
+        self.max_pause = max(0.0, max_pause)
+        self.tokens = float(self.burst)
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self._updated = time.monotonic()
+        self._queue: Deque[_Ticket] = deque()
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.throttled = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+
+    def _try_take(self, ticket: _Ticket) -> Optional[float]:
+        """
+        Called with the lock held. Returns 0 once `ticket` holds a slot,
+        otherwise how long to wait before checking again (None means "until
+        woken by a release").
+        """
+        if self._queue[0] is not ticket:
+            return None
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.in_flight >= int(self.window):
+            return None
+
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self.tokens < 1:
+            return (1 - self.tokens) / self.rate
+
+        self.tokens -= 1
+        self.in_flight += 1
+        self.acquired += 1
+        self._queue.popleft()
+        self._wake_head()
+        return 0
+
+    def _wake_head(self):
+        if self._queue:
+            self._queue[0].wake()
+
+    def _until_deadline(self, wait: Optional[float], deadline: Optional[float]) -> Optional[float]:
+        # Gives up as soon as the known wait (a pause or an empty bucket)
+        # runs past the deadline, rather than sleeping until it does.
+        if deadline is None:
+            return wait
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or (wait is not None and wait > remaining):
+            self.timeouts += 1
+            raise RateLimitTimeout(self.host, wait if wait is not None else self.backoff)
+        return remaining if wait is None else wait
+
+    def _abandon(self, ticket: _Ticket):
+        with self._lock:
+            if ticket in self._queue:
+                self._queue.remove(ticket)
+                self._wake_head()
+
+    def acquire(self, timeout: Optional[float] = None):
+        """
+        Blocks the calling thread until a request to the host may start.
+        Raises RateLimitTimeout if that can't happen within `timeout` seconds.
+        """
+        ticket = _Ticket()
+        started = time.monotonic()
+        deadline = started + timeout if timeout is not None else None
+        with self._lock:
+            self._queue.append(ticket)
+        try:
+            while True:
+                with self._lock:
+                    wait = self._try_take(ticket)
+                if wait == 0:
+                    break
+                ticket.event.wait(self._until_deadline(wait, deadline))
+                ticket.event.clear()
+        except BaseException:
+            self._abandon(ticket)
+            raise
+        waited = time.monotonic() - started
+        self.wait_seconds += waited
+        note_wait(waited)
+
+    async def acquire_async(self, timeout: Optional[float] = None):
+        """Like `acquire`, but waits on the event loop instead of a thread."""
+        ticket = _Ticket(asyncio.get_running_loop())
+        started = time.monotonic()
+        deadline = started + timeout if timeout is not None else None
+        with self._lock:
+            self._queue.append(ticket)
+        try:
+            while True:
+                with self._lock:
+                    ticket.future = ticket.loop.create_future()
+                    wait = self._try_take(ticket)
+                if wait == 0:
+                    break
+                await asyncio.wait({ticket.future}, timeout=self._until_deadline(wait, deadline))
+        except BaseException:
+            self._abandon(ticket)
+            raise
+        waited = time.monotonic() - started
+        self.wait_seconds += waited
+        note_wait(waited)
+
+    def release(self, status: Optional[int] = None, retry_after: Optional[float] = None):
+        """
+        Returns the slot taken by `acquire`. `status` is the response status,
+        or None if the request failed without one.
+        """
+        with self._lock:
+            self.in_flight -= 1
+            if status in THROTTLE_STATUSES:
+                self.throttled += 1
+                self.window = max(self.min_window, self.window / 2)
+                pause = min(self.max_pause, retry_after if retry_after is not None else self.backoff)
+                self.blocked_until = max(self.blocked_until, time.monotonic() + pause)
+            elif status is not None and status < 500:
+                self.window = min(self.max_window, self.window + 1 / self.window)
+            self._wake_head()
+
+    def paused_for(self) -> float:
+        """Seconds left until the host's current pause ends (0 if not paused)."""
+        return max(0.0, self.blocked_until - time.monotonic())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "rate": self.rate,
+                "window": round(self.window, 2),
+                "in_flight": self.in_flight,
+                "waiting": len(self._queue),
+                "paused_for": round(self.paused_for(), 2),
+                "acquired": self.acquired,
+                "throttled": self.throttled,
+                "timeouts": self.timeouts,
+                "wait_seconds": round(self.wait_seconds, 3),
+            }
+
+
+class RateLimiter():
+    """
+    Hands out one HostLimiter per host. Limits come from RATE_LIMIT_RPS,
+    RATE_LIMIT_BURST, RATE_LIMIT_WINDOW, RATE_LIMIT_MAX_WINDOW,
+    RATE_LIMIT_BACKOFF and RATE_LIMIT_MAX_PAUSE, each overridable per host
+    by appending the host name, e.g. RATE_LIMIT_RPS_API_COMICK_FUN=2. Hosts
+    in HOST_DEFAULTS start from their own limits instead of the defaults.
+    """
+
+    def __init__(self):
+        self._hosts: Dict[str, HostLimiter] = {}
+        self._lock = threading.Lock()
+
+    def host(self, host: str) -> HostLimiter:
+        limiter = self._hosts.get(host)
+        if limiter is None:
+            with self._lock:
+                limiter = self._hosts.get(host)
+                if limiter is None:
+                    defaults = HOST_DEFAULTS.get(host, {})
+                    limiter = HostLimiter(
+                        host,
+                        rate=source_env_float("RATE_LIMIT_RPS", host, defaults.get("rps", 5.0)),
+                        burst=source_env_int("RATE_LIMIT_BURST", host, defaults.get("burst", 10)),
+                        window=source_env_int("RATE_LIMIT_WINDOW", host, defaults.get("window", 4)),
+                        max_window=source_env_int("RATE_LIMIT_MAX_WINDOW", host, 32),
+                        backoff=source_env_float("RATE_LIMIT_BACKOFF", host, 1.0),
+                        max_pause=source_env_float("RATE_LIMIT_MAX_PAUSE", host, 60.0),
+                    )
+                    self._hosts[host] = limiter
+        return limiter
+
+    def for_url(self, url: str) -> HostLimiter:
+        return self.host(urlsplit(str(url)).hostname or "")
+
+    def stats(self) -> Dict[str, Any]:
+        return {host: limiter.stats() for host, limiter in sorted(self._hosts.items())}
+
+
+rate_limiter = RateLimiter()
+
+
+def timeout_seconds(timeout: Any) -> Optional[float]:
+    """The longest part of a requests timeout, which may be a (connect, read) tuple."""
+    if isinstance(timeout, tuple):
+        timeout = max((value for value in timeout if value is not None), default=None)
+    return timeout
+
+
+def _requests_adapter_class():
+    from requests.adapters import BaseAdapter
+
+    class RateLimitedAdapter(BaseAdapter):
+        """Wraps a mounted requests adapter so every send goes through the host limiter."""
+
+        def __init__(self, inner, limiter: RateLimiter, timeout: Optional[float] = None):
+            super().__init__()
+            self.inner = inner
+            self.limiter = limiter
+            self.timeout = timeout
+
+        def send(self, request, **kwargs):
+            # Some scrapers call session.get without a timeout, which would
+            # let a hung upstream hold a worker thread forever.
+            if kwargs.get("timeout") is None:
+                kwargs["timeout"] = self.timeout
+            # The wait for a slot counts against the request's own timeout,
+            # which the inner adapter only applies once the request is sent.
+            host = self.limiter.for_url(request.url)
+            host.acquire(timeout_seconds(kwargs["timeout"]))
+            try:
+                response = self.inner.send(request, **kwargs)
+            except BaseException:
+                host.release()
+                raise
+            host.release(response.status_code, parse_retry_after(response.headers.get("Retry-After")))
+            return response
+
+        def close(self):
+            self.inner.close()
+
+    return RateLimitedAdapter
+
+
+_adapter_class = None
+
+
+def limit_session(session, limiter: RateLimiter = rate_limiter):
+    """
+    Routes every request made through a requests (or cloudscraper) session
+    through the shared per-host limiter, and applies UPSTREAM_TIMEOUT to
+    requests made without a timeout. The session's own adapters are wrapped
+    rather than replaced, so their TLS and pool settings still apply.
+    """
+    global _adapter_class
+    if _adapter_class is None:
+        _adapter_class = _requests_adapter_class()
+    timeout = env_float("UPSTREAM_TIMEOUT", 30.0)
+    for prefix, adapter in list(session.adapters.items()):
+        if not isinstance(adapter, _adapter_class):
+            session.mount(prefix, _adapter_class(adapter, limiter, timeout))
+    return session
+
+
+def _async_transport_class():
+    import httpx
+
+    class RateLimitedTransport(httpx.AsyncBaseTransport):
+        """The httpx counterpart of RateLimitedAdapter, for AsyncScraper sources."""
+
+        def __init__(self, inner: "httpx.AsyncBaseTransport", limiter: RateLimiter):
+            self.inner = inner
+            self.limiter = limiter
+
+        async def handle_async_request(self, request):
+            # Waiting for a slot is bounded like waiting for a pooled connection.
+            host = self.limiter.host(request.url.host)
+            await host.acquire_async(request.extensions.get("timeout", {}).get("pool"))
+            try:
+                response = await self.inner.handle_async_request(request)
+            except BaseException:
+                host.release()
+                raise
+            host.release(response.status_code, parse_retry_after(response.headers.get("Retry-After")))
+            return response
+
+        async def aclose(self):
+            await self.inner.aclose()
+
+    return RateLimitedTransport
+
+
+_transport_class = None
+
+
+def limit_transport(transport, limiter: RateLimiter = rate_limiter):
+    """Wraps an httpx async transport so its requests go through the host limiter."""
+    global _transport_class
+    if _transport_class is None:
+        _transport_class = _async_transport_class()
+    return _transport_class(transport, limiter)
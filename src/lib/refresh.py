@@ -0,0 +1,60 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Set
+
+
+class BackgroundRefresher:
+    """
+    Runs cache refreshes in the background for stale-while-revalidate.
+
+    A key is refreshed at most once at a time, and each source runs at most
+    `per_source_limit` refreshes concurrently. Refreshes over that cap are
+    skipped rather than queued: the stale value is still being served, and
+    the next request for the key will try again.
+    """
+
+    def __init__(self, per_source_limit: int = 2):
+        self.per_source_limit = max(1, per_source_limit)
+        self._running: Dict[str, int] = {}
+        self._keys: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self.scheduled = 0
+        self.skipped = 0
+        self.completed = 0
+        self.failed = 0
+
+    def schedule(self, source: str, key: str, refresh: Callable[[], Awaitable[Any]]) -> bool:
+        if key in self._keys:
+            return False
+        if self._running.get(source, 0) >= self.per_source_limit:
+            self.skipped += 1
+            return False
+
+        self._keys.add(key)
+        self._running[source] = self._running.get(source, 0) + 1
+        self.scheduled += 1
+        task = asyncio.ensure_future(self._run(source, key, refresh))
+        # Keep a reference so the task isn't garbage collected mid-flight.
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _run(self, source: str, key: str, refresh: Callable[[], Awaitable[Any]]):
+        try:
+            await refresh()
+            self.completed += 1
+        except Exception as e:
+            self.failed += 1
+            print(f"Background refresh failed for {key}: {e}")
+        finally:
+            self._keys.discard(key)
+            self._running[source] -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "per_source_limit": self.per_source_limit,
+            "running": {source: count for source, count in self._running.items() if count},
+            "scheduled": self.scheduled,
+            "skipped": self.skipped,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
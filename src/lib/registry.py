@@ -0,0 +1,140 @@
+import importlib
+import inspect
+import json
+import os
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+
+MANIFEST_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "sources", "manifest.json")
+
+
+class SourceEntry():
+    def __init__(self, key: str, name: str, url: str, module: str, class_name: str):
+        self.key = key
+        self.name = name
+        self.url = url
+        self.module = module
+        self.class_name = class_name
+
+    def get(self) -> dict:
+        return {
+            "key": self.key,
+            "name": self.name,
+            "url": self.url,
+            "module": self.module,
+            "class": self.class_name
+        }
+
+
+class SourceRegistry():
+    """
+    Serves source metadata from a static manifest and only imports and builds
+    a scraper the first time it is used. This keeps cold starts down to the
+    cost of reading one JSON file, no matter how many sources there are.
+    """
+
+    def __init__(self, entries: List[SourceEntry]):
+        self.entries: Dict[str, SourceEntry] = {entry.key: entry for entry in entries}
+        self._instances: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {key: threading.Lock() for key in self.entries}
+
+    @classmethod
+    def from_manifest(cls, path: str = MANIFEST_PATH) -> "SourceRegistry":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        entries = [
+            SourceEntry(item["key"], item["name"], item["url"], item["module"], item["class"])
+            for item in data
+        ]
+        return cls(entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key.lower() in self.entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def keys(self) -> List[str]:
+        return list(self.entries)
+
+    def entry(self, key: str) -> Optional[SourceEntry]:
+        return self.entries.get(key.lower())
+
+    def describe(self) -> List[dict]:
+        return [{"name": entry.name, "url": entry.url} for entry in self.entries.values()]
+
+    def is_loaded(self, key: str) -> bool:
+        return key.lower() in self._instances
+
+    def get(self, key: str):
+        """
+        Returns the scraper for `key`, importing and constructing it on first
+        use. Returns None for unknown keys; import or constructor errors are
+        raised to the caller.
+        """
+        key = key.lower()
+        instance = self._instances.get(key)
+        if instance is not None:
+            return instance
+
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        with self._locks[key]:
+            instance = self._instances.get(key)
+            if instance is None:
+                module = importlib.import_module(entry.module)
+                instance = getattr(module, entry.class_name)()
+                self._instances[key] = instance
+        return instance
+
+    def __getitem__(self, key: str):
+        instance = self.get(key)
+        if instance is None:
+            raise KeyError(key)
+        return instance
+
+    def load_all(self) -> List[Any]:
+        return [self.get(key) for key in self.entries]
+
+
+def discover_sources(sources_dir: str = os.path.join("src", "sources")) -> List[SourceEntry]:
+    """
+    Imports every module in the sources directory and returns manifest entries
+    for the scrapers it finds. Used to regenerate the manifest after adding a
+    source: `python -m src.lib.registry`.
+    """
+    from src.lib.types import Scraper, AsyncScraper
+
+    entries = []
+    for filename in sorted(os.listdir(sources_dir)):
+        if filename.endswith('.py') and not filename.startswith('__'):
+            module_name = f"src.sources.{filename[:-3]}"
+
+            try:
+                module = importlib.import_module(module_name)
+
+                for name, obj in inspect.getmembers(module):
+                    if (inspect.isclass(obj) and
+                        issubclass(obj, Scraper) and
+                        obj not in (Scraper, AsyncScraper) and
+                        obj.__module__ == module_name):
+
+                        scraper = obj()
+                        entries.append(SourceEntry(scraper.name.lower(), scraper.name, scraper.base_url, module_name, name))
+            except Exception as e:
+                print(f"Error importing {module_name}: {e}")
+
+    return entries
+
+
+if __name__ == "__main__":
+    discovered = discover_sources()
+    with open(MANIFEST_PATH, "w", encoding="utf-8") as f:
+        json.dump([entry.get() for entry in discovered], f, indent=2)
+        f.write("\n")
+    print(f"Wrote {len(discovered)} sources to {MANIFEST_PATH}")
@@ -0,0 +1,53 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls. While a call for a key is in flight,
+    later callers with the same key wait for that call instead of starting
+    their own, and all of them get its result or its exception.
+
+    Calls run as their own task, so one caller giving up (timeout, client
+    disconnect) does not cancel the work the others are waiting on.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.executions = 0
+        self.coalesced = 0
+        self._by_operation: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, operation: Optional[str], field: str):
+        if operation is None:
+            return
+        counters = self._by_operation.setdefault(operation, {"executions": 0, "coalesced": 0})
+        counters[field] += 1
+
+    def _forget(self, key: Hashable, task: asyncio.Future):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every waiter went away.
+            task.exception()
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]], operation: Optional[str] = None) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            self.executions += 1
+            self._count(operation, "executions")
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+            self._count(operation, "coalesced")
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls),
+            "by_operation": {name: dict(counters) for name, counters in self._by_operation.items()},
+        }
@@ -0,0 +1,196 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from src.lib.clearance import get_clearance_store
+from src.lib.config import source_env_float, source_env_int
+from src.lib.ratelimit import limit_session, rate_limiter, timeout_seconds
+
+# Statuses retried by Transport.request. 429 and 503 also pause the host in
+# the rate limiter, so the retry waits there rather than hammering it.
+RETRY_STATUSES = (429, 502, 503, 504)
+
+# Called as hook(source, method, url, status, elapsed_seconds, size_bytes)
+# after every upstream response, or with status None after a network error.
+TimingHook = Callable[[str, str, str, Optional[int], float, int], None]
+_hooks: List[TimingHook] = []
+
+
+def add_timing_hook(hook: TimingHook):
+    _hooks.append(hook)
+
+
+def remove_timing_hook(hook: TimingHook):
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+class HttpStats():
+    """Per-source upstream request counters, served under "http" in /api/stats."""
+
+    def __init__(self):
+        self._sources: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, source: str, method: str, url: str, status: Optional[int], elapsed: float, size: int):
+        with self._lock:
+            stats = self._sources.setdefault(source, {
+                "requests": 0,
+                "errors": 0,
+                "statuses": {},
+                "bytes": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+            })
+            stats["requests"] += 1
+            if status is None:
+                stats["errors"] += 1
+            else:
+                bucket = f"{status // 100}xx"
+                stats["statuses"][bucket] = stats["statuses"].get(bucket, 0) + 1
+            stats["bytes"] += size
+            elapsed_ms = elapsed * 1000
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                source: {
+                    **stats,
+                    "statuses": dict(stats["statuses"]),
+                    "total_ms": round(stats["total_ms"], 1),
+                    "max_ms": round(stats["max_ms"], 1),
+                    "avg_ms": round(stats["total_ms"] / stats["requests"], 1) if stats["requests"] else 0,
+                }
+                for source, stats in sorted(self._sources.items())
+            }
+
+
+http_stats = HttpStats()
+
+
+def record_response(source: str, method: str, url: str, status: Optional[int], elapsed: float, size: int):
+    http_stats.record(source, method, url, status, elapsed, size)
+    for hook in list(_hooks):
+        try:
+            hook(source, method, url, status, elapsed, size)
+        except Exception as e:
+            print(f"Timing hook failed: {e}")
+
+
+def response_size(headers, body: bytes) -> int:
+    # Bytes on the wire when the server says so, decoded size otherwise.
+    length = headers.get("content-length")
+    return int(length) if length and length.isdigit() else len(body)
+
+
+def create_session(pool_size: int, source: Optional[str] = None):
+    """
+    Builds a cloudscraper session with its connection pool sized for
+    `pool_size` concurrent requests per host, routed through the shared
+    rate limiter. With a `source`, cookies and the User-Agent saved by an
+    earlier process for it are loaded, so a solved challenge carries over.
+    """
+    import cloudscraper
+
+    session = cloudscraper.create_scraper(
+        browser={
+            'browser': 'chrome',
+            'platform': 'windows',
+            'mobile': False
+        }
+    )
+    # Resize the adapters cloudscraper mounted rather than mounting new ones,
+    # which would drop its TLS settings.
+    for adapter in session.adapters.values():
+        adapter._pool_connections = adapter._pool_maxsize = pool_size
+        adapter.init_poolmanager(pool_size, pool_size, block=adapter._pool_block)
+
+    store = get_clearance_store() if source else None
+    if store is not None:
+        try:
+            store.load(source, session)
+        except Exception as e:
+            print(f"Could not load saved cookies for {source}: {e}")
+    return limit_session(session)
+
+
+class Transport():
+    """
+    The HTTP client behind every sync Scraper: one pooled, rate-limited
+    session per source with a default timeout, retries for throttling and
+    gateway errors, and per-request timing. Settings are read per source:
+    HTTP_POOL_SIZE, UPSTREAM_TIMEOUT and HTTP_RETRIES.
+
+    Cookies, including Cloudflare clearance, are persisted per source in
+    the clearance store, so they survive restarts and are shared between
+    worker processes.
+
+    Compression is negotiated by the session (gzip and deflate, plus br when
+    brotli is installed) and decoded transparently.
+    """
+
+    def __init__(self, source: str, pool_size: Optional[int] = None, timeout: Optional[float] = None, retries: Optional[int] = None):
+        self.source = source.lower()
+        self.pool_size = pool_size or source_env_int("HTTP_POOL_SIZE", self.source, 10)
+        self.timeout = timeout if timeout is not None else source_env_float("UPSTREAM_TIMEOUT", self.source, 30.0)
+        self.retries = retries if retries is not None else source_env_int("HTTP_RETRIES", self.source, 2)
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        # Built on first use so sources that are never called don't pay for it.
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = create_session(self.pool_size, self.source)
+        return self._session
+
+    def _save_clearance(self, response):
+        # Cheap when nothing changed: the store compares the jar with the
+        # cookies it last saved before touching the database. The User-Agent
+        # is taken from the request as sent, since scrapers' own headers
+        # override the session's randomized one.
+        store = get_clearance_store()
+        if store is None:
+            return
+        try:
+            store.save(self.source, self._session, response.request.headers.get("User-Agent"))
+        except Exception as e:
+            print(f"Could not save cookies for {self.source}: {e}")
+
+    def request(self, method: str, url: str, retries: Optional[int] = None, timeout: Optional[float] = None, **kwargs):
+        """
+        Sends a request and returns the final response, whatever its status.
+        Responses in RETRY_STATUSES and connection errors are retried up to
+        `retries` times; a network error on the last attempt is raised.
+
+        A throttled response is returned as it is, without retrying, when the
+        host's pause outlasts the request timeout: the retry could only spend
+        its time waiting. RateLimitTimeout from the limiter is never retried.
+        """
+        from requests.exceptions import ConnectionError, Timeout
+
+        retries = self.retries if retries is None else retries
+        timeout = timeout or self.timeout
+        for attempt in range(retries + 1):
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except (ConnectionError, Timeout):
+                record_response(self.source, method, url, None, time.perf_counter() - started, 0)
+                if attempt < retries:
+                    continue
+                raise
+
+            record_response(self.source, method, url, response.status_code, time.perf_counter() - started, response_size(response.headers, response.content))
+            self._save_clearance(response)
+            if response.status_code in RETRY_STATUSES and attempt < retries and not self._paused_past(url, timeout):
+                continue
+            return response
+
+    def _paused_past(self, url: str, timeout: Any) -> bool:
+        timeout = timeout_seconds(timeout)
+        return timeout is not None and rate_limiter.for_url(url).paused_for() >= timeout
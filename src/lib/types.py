@@ -1,5 +1,10 @@
-import requests
 import os
+import time
+from typing import Any, List, Iterator, AsyncIterator, Optional
+from src.lib.async_http import get_async_client
+from src.lib.html import ParseOnly, parse_html
+from src.lib import json_codec
+from src.lib.transport import Transport, record_response, response_size
 
 class Manga():
     def __init__(self, id: str, url: str, title: str, author: str, description: str, poster: str, chapters: int, tags:list=[], genres: list=[], status: str="Ongoing", rating: float=-1.00, chapter_ids: dict= {"Chapter 1": "xxxxxxxx"}):
@@ -35,6 +40,10 @@ class Manga():
             #"chapters_and_pages": self._chapters_and_pages_model
         }
 
+    def to_json(self) -> bytes:
+        """`get()` encoded as JSON, for responses that skip FastAPI's encoder."""
+        return json_codec.dumps(self.get())
+
 class Chapter():
     def __init__(self, title: str, pages: list, id):
         self.id = id
@@ -50,11 +59,169 @@ class Chapter():
             "pages": self.pages
         }
 
+    def to_json(self) -> bytes:
+        return json_codec.dumps(self.get())
+
+class ChapterRecord():
+    """One entry of a manga's chapter list, as served by /api/manga/chapters."""
+
+    def __init__(self, id: str, name: str, number: Optional[float] = None, volume: Optional[float] = None, uploaded: Optional[int] = None, scanlator: Optional[str] = None):
+        self.id = id
+        self.name = name
+        self.number = number
+        self.volume = volume
+        self.uploaded = uploaded
+        self.scanlator = scanlator
+
+    def get(self) -> dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "number": self.number,
+            "volume": self.volume,
+            "uploaded": self.uploaded,
+            "scanlator": self.scanlator
+        }
+
+def chapter_map(records: List[ChapterRecord]) -> dict:
+    """Builds the `chapter_ids` name -> ID map carried by Manga."""
+    return {record.name: record.id for record in records}
+
 class Scraper():
+    # Extra keyword arguments the listing methods accept, e.g.
+    # ("include_chapters",). main.py only forwards options listed here.
+    listing_options = ()
+    # Default request headers, merged under any headers passed to fetch_*.
+    headers = {}
+    # Connections kept per host; None uses HTTP_POOL_SIZE.
+    http_pool_size = None
+
     def __init__(self, name="Missing Name", url="Missing Url", api_url=None, scraper_version="1.0.0"):
         self.name = name
         self.base_url = url
         self.api_url = api_url
         self.scraper_version = scraper_version
         self.available_filters = {}
-        self.available_qualities = []
\ No newline at end of file
+        self.available_qualities = []
+        self._transport = None
+
+    @property
+    def transport(self) -> Transport:
+        if self._transport is None:
+            self._transport = Transport(self.name, pool_size=self.http_pool_size)
+        return self._transport
+
+    @property
+    def session(self):
+        return self.transport.session
+
+    def fetch(self, url: str, method: str = "GET", headers: Optional[dict] = None, **kwargs):
+        """
+        Sends a request through the source's transport with the scraper's
+        default headers. Network errors are raised once retries run out.
+        """
+        return self.transport.request(method, url, headers={**self.headers, **(headers or {})}, **kwargs)
+
+    def fetch_text(self, url: str, method: str = "GET", **kwargs) -> Optional[str]:
+        """Returns the response body, or None for a non-2xx response."""
+        response = self.fetch(url, method, **kwargs)
+        if not 200 <= response.status_code < 300:
+            return None
+        return response.text
+
+    def fetch_json(self, url: str, method: str = "GET", schema: Any = None, **kwargs) -> Any:
+        """
+        Returns the decoded JSON body, or None for a non-2xx or non-JSON
+        response. A `schema` TypedDict lets the codec skip unused fields.
+        """
+        response = self.fetch(url, method, **kwargs)
+        if not 200 <= response.status_code < 300:
+            return None
+        try:
+            return json_codec.decode(response.content, schema)
+        except ValueError:
+            return None
+
+    def fetch_html(self, url: str, method: str = "GET", only: Optional[ParseOnly] = None, **kwargs):
+        """
+        Returns the parsed page, or None for a non-2xx response. Pass `only`
+        to build just the elements the caller reads.
+        """
+        text = self.fetch_text(url, method, **kwargs)
+        if text is None:
+            return None
+        return parse_html(text, only=only)
+
+    # Streaming variants of the listing methods. Sources that build results
+    # one item at a time should override these so each manga can be sent as
+    # soon as it is ready; the defaults just walk the finished list.
+    def iter_popular_manga(self, page: int = 1, **options) -> Iterator[Manga]:
+        yield from self.popular_manga(page, **options)
+
+    def iter_latest_manga(self, page: int = 1, **options) -> Iterator[Manga]:
+        yield from self.latest_manga(page, **options)
+
+    def iter_search_manga(self, query: str, page: int = 1, **options) -> Iterator[Manga]:
+        yield from self.search_manga(query, page, **options)
+
+    def get_chapter_list(self, manga_id: str) -> List[ChapterRecord]:
+        """Returns every chapter of one manga, newest first."""
+        raise NotImplementedError(f"{self.name} does not support chapter listings")
+
+class AsyncScraper(Scraper):
+    """
+    Base for scrapers whose listing and chapter methods are coroutines. These
+    are awaited directly on the event loop instead of going through a worker
+    thread, and share one pooled async HTTP client.
+    """
+
+    @property
+    def http(self):
+        return get_async_client()
+
+    async def fetch(self, url: str, method: str = "GET", headers: Optional[dict] = None, **kwargs):
+        source = self.name.lower()
+        started = time.perf_counter()
+        try:
+            response = await self.http.request(method, url, headers={**self.headers, **(headers or {})}, **kwargs)
+        except Exception:
+            record_response(source, method, url, None, time.perf_counter() - started, 0)
+            raise
+        record_response(source, method, url, response.status_code, time.perf_counter() - started, response_size(response.headers, response.content))
+        return response
+
+    async def fetch_json(self, url: str, method: str = "GET", schema: Any = None, **kwargs) -> Any:
+        response = await self.fetch(url, method, **kwargs)
+        if not 200 <= response.status_code < 300:
+            return None
+        try:
+            return json_codec.decode(response.content, schema)
+        except ValueError:
+            return None
+
+    async def popular_manga(self, page: int = 1) -> List[Manga]:
+        raise NotImplementedError
+
+    async def latest_manga(self, page: int = 1) -> List[Manga]:
+        raise NotImplementedError
+
+    async def search_manga(self, query: str, page: int = 1) -> List[Manga]:
+        raise NotImplementedError
+
+    async def get_chapter(self, chapter_id: str) -> Chapter:
+        raise NotImplementedError
+
+    async def iter_popular_manga(self, page: int = 1, **options) -> AsyncIterator[Manga]:
+        for manga in await self.popular_manga(page, **options):
+            yield manga
+
+    async def iter_latest_manga(self, page: int = 1, **options) -> AsyncIterator[Manga]:
+        for manga in await self.latest_manga(page, **options):
+            yield manga
+
+    async def iter_search_manga(self, query: str, page: int = 1, **options) -> AsyncIterator[Manga]:
+        for manga in await self.search_manga(query, page, **options):
+            yield manga
+
+    async def get_chapter_list(self, manga_id: str) -> List[ChapterRecord]:
+        raise NotImplementedError(f"{self.name} does not support chapter listings")
@@ -1,14 +1,30 @@
-import json
 import re
 import time
-import urllib.parse
-import requests
-import cloudscraper
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator, TypedDict
 from datetime import datetime
-from src.lib.types import Scraper, Manga, Chapter
+from src.lib.cache import LRUCache
+from src.lib.config import env_int
+from src.lib.ratelimit import RateLimitTimeout
+from src.lib.types import Scraper, Manga, Chapter, ChapterRecord
+
+class ChapterListEntry(TypedDict, total=False):
+    hid: str
+    chap: Optional[str]
+    vol: Optional[str]
+    title: Optional[str]
+    lang: Optional[str]
+    created_at: Optional[str]
+    publish_at: Optional[str]
+    group_name: Optional[List[str]]
+
+# The fields _get_chapters reads from /comic/{hid}/chapters. The response
+# runs to megabytes with limit=99999, most of it in fields never used.
+class ChapterListResponse(TypedDict, total=False):
+    chapters: List[ChapterListEntry]
 
 class Comick(Scraper):
+    listing_options = ("include_chapters",)
+
     def __init__(self):
         super().__init__(
             name="Comick",
@@ -19,13 +35,6 @@ class Comick(Scraper):
         self.available_filters = self._get_filters()
         self.available_qualities = []
         self.lang = "en"
-        self.session = cloudscraper.create_scraper(
-            browser={
-                'browser': 'chrome',
-                'platform': 'windows',
-                'mobile': False
-            }
-        )
         self.headers = {
             "Referer": f"{self.base_url}/",
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
@@ -49,29 +58,43 @@ class Comick(Scraper):
         }
         self.search_results = []
         self.chapters_limit = 99999
+        self.chapter_cache = LRUCache(env_int("COMICK_CHAPTER_CACHE_SIZE", 256))
+        self.chapter_cache_ttl = env_int("COMICK_CHAPTER_TTL", 3600)
 
     def popular_manga_request(self, page: int = 1) -> List[Dict[str, Any]]:
         filters = {"sort": "follow"}
         return self._search_manga_request(page=page, query="", filters=filters)
 
-    def popular_manga(self, page: int = 1) -> List[Manga]:
+    def popular_manga(self, page: int = 1, include_chapters: bool = False) -> List[Manga]:
         manga_list = self.popular_manga_request(page)
-        return [self._convert_to_manga(manga) for manga in manga_list]
+        return [self._convert_to_manga(manga, include_chapters) for manga in manga_list]
+
+    def iter_popular_manga(self, page: int = 1, include_chapters: bool = False) -> Iterator[Manga]:
+        for manga in self.popular_manga_request(page):
+            yield self._convert_to_manga(manga, include_chapters)
 
     def latest_manga_request(self, page: int = 1) -> List[Dict[str, Any]]:
         filters = {"sort": "uploaded"}
         return self._search_manga_request(page=page, query="", filters=filters)
 
-    def latest_manga(self, page: int = 1) -> List[Manga]:
+    def latest_manga(self, page: int = 1, include_chapters: bool = False) -> List[Manga]:
         manga_list = self.latest_manga_request(page)
-        return [self._convert_to_manga(manga) for manga in manga_list]
+        return [self._convert_to_manga(manga, include_chapters) for manga in manga_list]
+
+    def iter_latest_manga(self, page: int = 1, include_chapters: bool = False) -> Iterator[Manga]:
+        for manga in self.latest_manga_request(page):
+            yield self._convert_to_manga(manga, include_chapters)
 
     def search_manga_request(self, query: str, page: int = 1, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         return self._search_manga_request(query, page, filters)
 
-    def search_manga(self, query: str, page: int = 1, filters: Optional[Dict[str, Any]] = None) -> List[Manga]:
+    def search_manga(self, query: str, page: int = 1, filters: Optional[Dict[str, Any]] = None, include_chapters: bool = False) -> List[Manga]:
         manga_list = self.search_manga_request(query, page, filters)
-        return [self._convert_to_manga(manga) for manga in manga_list]
+        return [self._convert_to_manga(manga, include_chapters) for manga in manga_list]
+
+    def iter_search_manga(self, query: str, page: int = 1, filters: Optional[Dict[str, Any]] = None, include_chapters: bool = False) -> Iterator[Manga]:
+        for manga in self.search_manga_request(query, page, filters):
+            yield self._convert_to_manga(manga, include_chapters)
 
     def manga_details_request(self, manga_id: str) -> Dict[str, Any]:
         manga = {"url": f"/comic/{manga_id}#"}
@@ -80,21 +103,29 @@ class Comick(Scraper):
     def manga_details(self, manga_id: str) -> Manga:
         manga_dict = self.manga_details_request(manga_id)
         return self._convert_to_manga(manga_dict)
+
+    def get_chapter_list(self, manga_id: str) -> List[ChapterRecord]:
+        chapters = self._get_chapters({"url": f"/comic/{manga_id}#"})
+        return [
+            ChapterRecord(
+                id=chapter["id"],
+                name=chapter["name"],
+                number=chapter["chapter_number"],
+                volume=chapter["volume"],
+                uploaded=chapter["uploaded"] or None,
+                scanlator=chapter["scanlator"]
+            )
+            for chapter in chapters
+        ]
         
     def get_chapter(self, chapter_id: str) -> Chapter:
         """Get chapter data with pages using chapter ID."""
-        chapter_data = self._get_pages(chapter_id)
-        page_urls = [page.get("url", "") for page in chapter_data]
-        
-        # Get chapter title/name from ID if possible
-        chapter_url = f"{self.api_url}/chapter/{chapter_id}"
-        params = {"tachiyomi": "true"}
-        
-        response = self._make_request(chapter_url, params=params)
+        # One /chapter/{hid} response gives both the pages and the title.
+        chap_data = self._fetch_chapter(chapter_id)
+        page_urls = [page.get("url", "") for page in self._pages_from_chapter(chap_data)]
         title = f"Chapter {chapter_id}"
         
-        if response and response.get("chapter"):
-            chap_data = response.get("chapter", {})
+        if chap_data:
             vol_str = chap_data.get("vol", "")
             chap_str = chap_data.get("chap", "")
             name = chap_data.get("title", "")
@@ -106,7 +137,7 @@ class Comick(Scraper):
             id=chapter_id
         )
 
-    def _convert_to_manga(self, manga_dict: Dict[str, Any]) -> Manga:
+    def _convert_to_manga(self, manga_dict: Dict[str, Any], include_chapters: bool = True) -> Manga:
         if not manga_dict:
             return None
 
@@ -120,8 +151,10 @@ class Comick(Scraper):
         status = manga_dict.get("status", "Ongoing")
         genres = manga_dict.get("genres", [])
 
-        # Only get chapter IDs and titles
-        chapter_list = self._get_chapters(manga_dict)
+        # Only get chapter IDs and titles. Listings skip this by default: it
+        # is one extra request per result, and the full list is available
+        # from /api/manga/chapters.
+        chapter_list = self._get_chapters(manga_dict) if include_chapters else []
         chapter_ids = {}
         
         for chapter in chapter_list:
@@ -154,7 +187,7 @@ class Comick(Scraper):
             params = {
                 "q": query.strip(),
                 "limit": 25,
-                "page": 1,
+                "page": page,
                 "tachiyomi": "true"
             }
 
@@ -177,7 +210,7 @@ class Comick(Scraper):
         url = f"{self.api_url}/v1.0/search"
         params = {
             "limit": 25,
-            "page": 1,
+            "page": page,
             "tachiyomi": "true"
         }
 
@@ -189,33 +222,21 @@ class Comick(Scraper):
                 if tag.strip():
                     params.setdefault("excluded-tags", []).append(self._format_tag(tag.strip()))
 
-        all_results = []
-        current_page = 1
-        has_next_page = True
-
-        while has_next_page and current_page <= 2:
-            params["page"] = current_page
-            response = self._make_request(url, params=params)
-
-            if not response or len(response) == 0:
-                has_next_page = False
-                break
-
-            for item in response:
-                manga = {
-                    "id": item.get("hid", ""),
-                    "title": item.get("title", "Unknown"),
-                    "url": f"/comic/{item.get('hid')}#", 
-                    "thumbnail_url": self._parse_cover(item.get("cover_url"), item.get("md_covers", [])),
-                    "description": item.get("desc", ""),
-                    "status": self._parse_status(item.get("status"), item.get("translation_completed"))
-                }
-                all_results.append(manga)
+        response = self._make_request(url, params=params)
+        if not response:
+            return []
 
-            if len(response) < params["limit"]:
-                has_next_page = False
-            else:
-                current_page += 1
+        all_results = []
+        for item in response:
+            manga = {
+                "id": item.get("hid", ""),
+                "title": item.get("title", "Unknown"),
+                "url": f"/comic/{item.get('hid')}#", 
+                "thumbnail_url": self._parse_cover(item.get("cover_url"), item.get("md_covers", [])),
+                "description": item.get("desc", ""),
+                "status": self._parse_status(item.get("status"), item.get("translation_completed"))
+            }
+            all_results.append(manga)
 
         return all_results
 
@@ -400,7 +421,7 @@ class Comick(Scraper):
         if self.lang != "all":
             params["lang"] = self.lang
 
-        response = self._make_request(url, params=params)
+        response = self._make_request(url, params=params, schema=ChapterListResponse)
         if not response:
             return []
 
@@ -456,25 +477,42 @@ class Comick(Scraper):
         else:
             chapter_hid = chapter
 
+        return self._pages_from_chapter(self._fetch_chapter(chapter_hid))
+
+    def _fetch_chapter(self, chapter_hid: str) -> Dict[str, Any]:
+        """
+        Returns the "chapter" object of /chapter/{hid}, retrying once with a
+        cache-buster if it came back without images. Results are memoized
+        so a chapter open, and any retry within it, costs one round trip.
+        """
+        chapter_data = self.chapter_cache.get(chapter_hid)
+        if chapter_data is not None:
+            return chapter_data
+
         url = f"{self.api_url}/chapter/{chapter_hid}"
         params = {"tachiyomi": "true"}
 
         response = self._make_request(url, params=params)
         if not response:
-            return []
+            return {}
 
         chapter_data = response.get("chapter", {})
-        images = chapter_data.get("images", [])
 
-        if not images:
+        if not chapter_data.get("images"):
             params["_"] = str(int(time.time() * 1000))
             response = self._make_request(url, params=params)
-            if response:
+            if response and response.get("chapter"):
                 chapter_data = response.get("chapter", {})
-                images = chapter_data.get("images", [])
 
+        # Chapters still missing images are only remembered briefly, so a
+        # later open gets another chance once the upload is processed.
+        ttl = self.chapter_cache_ttl if chapter_data.get("images") else 60
+        self.chapter_cache.set(chapter_hid, chapter_data, ttl)
+        return chapter_data
+
+    def _pages_from_chapter(self, chapter_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         pages = []
-        for i, img in enumerate(images):
+        for i, img in enumerate(chapter_data.get("images", []) or []):
             if img.get("url"):
                 pages.append({
                     "index": i,
@@ -483,51 +521,20 @@ class Comick(Scraper):
 
         return pages
 
-    def _make_request(self, url: str, params: Optional[Dict[str, Any]] = None, method: str = "GET", retries: int = 3) -> Any:
+    def _make_request(self, url: str, params: Optional[Dict[str, Any]] = None, method: str = "GET", retries: Optional[int] = None, schema: Any = None) -> Any:
+        # Retries for 429/5xx and dropped connections happen in the shared
+        # transport, which also waits out the host's rate-limit pause.
         try:
-            if method == "GET" and params:
-                query_params = []
-                for key, value in params.items():
-                    if isinstance(value, list):
-                        for item in value:
-                            query_params.append((key, item))
-                    else:
-                        query_params.append((key, value))
-
-                url_parts = list(urllib.parse.urlparse(url))
-                query = urllib.parse.urlencode(query_params, doseq=True)
-                url_parts[4] = query
-                url = urllib.parse.urlunparse(url_parts)
-                params = None
-
-            last_error = None
-            for attempt in range(retries):
-                try:
-                    response = self.session.request(
-                        method,
-                        url,
-                        params=params,
-                        headers=self.headers,
-                        timeout=30
-                    )
-                    response.raise_for_status()
-
-                    data = response.json()
-
-                    if isinstance(data, dict) and "statusCode" in data and "message" in data:
-                        return None
-
-                    return data
-
-                except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
-                    last_error = e
-                    wait_time = 2 ** attempt
-                    time.sleep(wait_time)
-
+            data = self.fetch_json(url, method=method, schema=schema, params=params, retries=retries)
+        except RateLimitTimeout:
+            # Surfaces as a 503 with Retry-After rather than an empty result.
+            raise
+        except Exception:
             return None
 
-        except Exception:
+        if isinstance(data, dict) and "statusCode" in data and "message" in data:
             return None
+        return data
 
     def _apply_filters(self, params: Dict[str, Any], filters: Dict[str, Any]):
         if "sort" in filters:
@@ -1,14 +1,14 @@
 
-import json
 import re
-import time
 import urllib.parse
-import requests
-import cloudscraper
 from typing import List, Dict, Any, Optional
 from datetime import datetime
+from src.lib.html import ParseOnly
 from src.lib.types import Scraper, Manga, Chapter
 
+# Gallery cards are the only links to /d/ pages a listing needs.
+LISTING_ONLY = ParseOnly("a", href=re.compile(r"/d/"))
+
 class Hentai3(Scraper):
     def __init__(self):
         super().__init__(
@@ -20,13 +20,6 @@ class Hentai3(Scraper):
         self.available_filters = self._get_filters()
         self.available_qualities = []
         self.lang = "all"
-        self.session = cloudscraper.create_scraper(
-            browser={
-                'browser': 'chrome',
-                'platform': 'windows',
-                'mobile': False
-            }
-        )
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
             "Referer": f"{self.base_url}/",
@@ -46,11 +39,10 @@ class Hentai3(Scraper):
         else:
             url = f"{self.base_url}/search?q=pages%3A>0&pages={page}&sort=popular"
         
-        response = self.session.get(url, headers=self.headers)
-        if response.status_code != 200:
+        soup = self.fetch_html(url, only=LISTING_ONLY)
+        if soup is None:
             return []
         
-        soup = self._parse_response(response.text)
         return self._extract_manga_list(soup)
 
     def popular_manga(self, page: int = 1) -> List[Manga]:
@@ -64,11 +56,10 @@ class Hentai3(Scraper):
         else:
             url = f"{self.base_url}/search?q=pages%3A>0&pages={page}"
         
-        response = self.session.get(url, headers=self.headers)
-        if response.status_code != 200:
+        soup = self.fetch_html(url, only=LISTING_ONLY)
+        if soup is None:
             return []
         
-        soup = self._parse_response(response.text)
         return self._extract_manga_list(soup)
 
     def latest_manga(self, page: int = 1) -> List[Manga]:
@@ -140,11 +131,10 @@ class Hentai3(Scraper):
             if sort:
                 url += f"&sort={sort}"
         
-        response = self.session.get(url, headers=self.headers)
-        if response.status_code != 200:
+        soup = self.fetch_html(url, only=LISTING_ONLY)
+        if soup is None:
             return []
         
-        soup = self._parse_response(response.text)
         return self._extract_manga_list(soup)
 
     def search_manga(self, query: str, page: int = 1, filters: Optional[Dict[str, Any]] = None) -> List[Manga]:
@@ -153,24 +143,22 @@ class Hentai3(Scraper):
 
     def manga_details_request(self, manga_id: str) -> Dict[str, Any]:
         url = f"{self.base_url}/d/{manga_id}"
-        response = self.session.get(url, headers=self.headers)
-        if response.status_code != 200:
+        soup = self.fetch_html(url)
+        if soup is None:
             return {}
         
-        soup = self._parse_response(response.text)
         return self._extract_manga_details(soup, manga_id)
 
     def get_chapter(self, chapter_id: str) -> Chapter:
         url = f"{self.base_url}/d/{chapter_id}"
-        response = self.session.get(url, headers=self.headers)
-        if response.status_code != 200:
+        soup = self.fetch_html(url)
+        if soup is None:
             return Chapter(
                 title="Error loading chapter",
                 pages=[],
                 id=chapter_id
             )
         
-        soup = self._parse_response(response.text)
         pages = []
         images = soup.select("img:not([class], [src*=thumb], [src*=cover])")
         
@@ -215,10 +203,6 @@ class Hentai3(Scraper):
             status=status
         )
 
-    def _parse_response(self, html_content: str):
-        from bs4 import BeautifulSoup
-        return BeautifulSoup(html_content, "html.parser")
-
     def _extract_manga_list(self, soup):
         manga_list = []
         manga_elements = soup.select("a[href*='/d/']")
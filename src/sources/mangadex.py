@@ -1,17 +1,16 @@
 
-import json
-import cloudscraper
-import requests
-import time
+import asyncio
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator
 from datetime import datetime
-from src.lib.types import Scraper, Manga, Chapter
+from src.lib.config import env_int
+from src.lib.types import AsyncScraper, Manga, Chapter, ChapterRecord
+
+class MangaDex(AsyncScraper):
+    listing_options = ("include_chapters",)
 
-class MangaDex(Scraper):
     def __init__(self):
         super().__init__("MangaDex", "https://mangadex.org", api_url="https://api.mangadex.org", scraper_version="1.0.0")
-        self.session = cloudscraper.create_scraper()
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
             "Accept": "application/json",
@@ -21,6 +20,8 @@ class MangaDex(Scraper):
         }
         self.cdn_url = "https://uploads.mangadex.org"
         self.lang = "en"
+        # Parallel /aggregate requests when a listing asks for chapter maps.
+        self.aggregate_concurrency = env_int("MANGADEX_AGGREGATE_CONCURRENCY", 8)
         self.available_filters = {
             "content_rating": ["safe", "suggestive", "erotica", "pornographic"],
             "order": ["relevance", "latestUploadedChapter", "title", "rating", "followedCount"],
@@ -28,9 +29,9 @@ class MangaDex(Scraper):
             "publication_demographic": ["none", "shounen", "shoujo", "seinen", "josei"]
         }
 
-    def search_manga(self, query: str, page: int = 1) -> List[Manga]:
-        offset = (page - 1) * 12
-        params = {
+    def _search_params(self, query: str, page: int = 1) -> Dict[str, Any]:
+        offset = (page - 1) * 25
+        return {
             "title": query,
             "limit": 25,
             "offset": offset,
@@ -38,74 +39,164 @@ class MangaDex(Scraper):
             "contentRating[]": ["safe", "suggestive", "erotica"],
             "availableTranslatedLanguage[]": self.lang
         }
-        
+
+    async def _request_manga_list(self, params: Dict[str, Any]) -> Dict[str, Any]:
         url = f"{self.api_url}/manga"
-        response = self.session.get(url, params=params, headers=self.headers)
-        
-        if response.status_code != 200:
-            return []
-            
-        data = response.json()
-        return self._parse_manga_list(data)
+        return await self.fetch_json(url, params=params) or {}
+
+    async def search_manga(self, query: str, page: int = 1, include_chapters: bool = False) -> List[Manga]:
+        data = await self._request_manga_list(self._search_params(query, page))
+        return await self._parse_manga_list(data, include_chapters)
+
+    async def iter_search_manga(self, query: str, page: int = 1, include_chapters: bool = False) -> AsyncIterator[Manga]:
+        data = await self._request_manga_list(self._search_params(query, page))
+        async for manga in self._iter_manga_list(data, include_chapters):
+            yield manga
         
-    def _parse_manga_list(self, data: Dict[str, Any]) -> List[Manga]:
-        manga_list = []
+    async def _parse_manga_list(self, data: Dict[str, Any], include_chapters: bool = False) -> List[Manga]:
+        return [manga async for manga in self._iter_manga_list(data, include_chapters)]
+
+    async def _iter_manga_list(self, data: Dict[str, Any], include_chapters: bool = False) -> AsyncIterator[Manga]:
+        items = data.get("data", [])
+        if isinstance(items, dict):
+            items = [items]
+
+        # Chapter maps cost one /aggregate call per manga, so they are only
+        # fetched on request, all at once with bounded parallelism. Results
+        # are still yielded in listing order as soon as each one is ready.
+        chapter_tasks = []
+        if include_chapters:
+            semaphore = asyncio.Semaphore(max(1, self.aggregate_concurrency))
+
+            async def bounded(manga_id):
+                async with semaphore:
+                    return await self._get_aggregate(manga_id)
+
+            chapter_tasks = [asyncio.ensure_future(bounded(item.get("id"))) for item in items]
+
+        try:
+            for index, manga_data in enumerate(items):
+                chapters = await chapter_tasks[index] if chapter_tasks else {}
+                yield self._build_manga(manga_data, chapters)
+        finally:
+            for task in chapter_tasks:
+                task.cancel()
+
+    async def _get_aggregate(self, manga_id: str) -> Dict[str, str]:
+        chapters = {}
+        try:
+            aggregate_url = f"{self.api_url}/manga/{manga_id}/aggregate?translatedLanguage[]={self.lang}"
+            agg_data = await self.fetch_json(aggregate_url)
+            if agg_data:
+                for volume_key, volume in agg_data.get("volumes", {}).items():
+                    for chapter_key, chapter in volume.get("chapters", {}).items():
+                        chapter_id = chapter.get("id")
+                        chapter_num = chapter_key if chapter_key != "none" else "1"
+                        chapters[f"Chapter {chapter_num}"] = chapter_id
+        except Exception:
+            pass
+        return chapters
+
+    async def get_chapter_list(self, manga_id: str) -> List[ChapterRecord]:
+        # /aggregate only has numbers and IDs, so the full list comes from the
+        # chapter feed, which is paged at 500 entries.
+        url = f"{self.api_url}/manga/{manga_id}/feed"
+        params = {
+            "translatedLanguage[]": self.lang,
+            "includes[]": "scanlation_group",
+            "order[volume]": "desc",
+            "order[chapter]": "desc",
+            "includeExternalUrl": 0,
+            "limit": 500,
+            "offset": 0
+        }
+
+        records = []
+        while True:
+            data = await self.fetch_json(url, params=params)
+            if not data:
+                break
+
+            for chapter in data.get("data", []):
+                records.append(self._build_chapter_record(chapter))
+
+            params["offset"] += params["limit"]
+            if params["offset"] >= data.get("total", 0):
+                break
+        return records
+
+    def _build_chapter_record(self, chapter: Dict[str, Any]) -> ChapterRecord:
+        attributes = chapter.get("attributes", {})
+        chap_str = attributes.get("chapter")
+        vol_str = attributes.get("volume")
+
+        name = f"Chapter {chap_str}" if chap_str else "Oneshot"
+        if attributes.get("title"):
+            name = f"{name}: {attributes['title']}"
+
+        scanlator = None
+        for relationship in chapter.get("relationships", []):
+            if relationship.get("type") == "scanlation_group":
+                scanlator = relationship.get("attributes", {}).get("name")
+                break
+
+        return ChapterRecord(
+            id=chapter.get("id"),
+            name=name,
+            number=self._parse_number(chap_str),
+            volume=self._parse_number(vol_str),
+            uploaded=self._parse_timestamp(attributes.get("publishAt")),
+            scanlator=scanlator
+        )
+
+    def _parse_number(self, value: Any) -> Any:
+        try:
+            return float(value) if value is not None else None
+        except ValueError:
+            return None
+
+    def _parse_timestamp(self, value: Any) -> Any:
+        try:
+            return int(datetime.fromisoformat(value).timestamp() * 1000) if value else None
+        except ValueError:
+            return None
+
+    def _build_manga(self, manga_data: Dict[str, Any], chapters: Dict[str, str]) -> Manga:
+        manga_id = manga_data.get("id")
+        attributes = manga_data.get("attributes", {})
         
-        for manga_data in data.get("data", []):
-            manga_id = manga_data.get("id")
-            attributes = manga_data.get("attributes", {})
+        title = attributes.get("title", {}).get(self.lang)
+        if not title:
+            title = attributes.get("title", {}).get("en")
+        if not title:
+            titles = list(attributes.get("title", {}).values())
+            title = titles[0] if titles else "Unknown Title"
             
-            title = attributes.get("title", {}).get(self.lang)
-            if not title:
-                title = attributes.get("title", {}).get("en")
-            if not title:
-                titles = list(attributes.get("title", {}).values())
-                title = titles[0] if titles else "Unknown Title"
-                
-            description = attributes.get("description", {}).get(self.lang)
-            if not description:
-                description = attributes.get("description", {}).get("en", "No description available.")
-            
-            cover_file = None
-            for relationship in manga_data.get("relationships", []):
-                if relationship.get("type") == "cover_art":
-                    cover_file = relationship.get("attributes", {}).get("fileName")
-                    
-            cover_url = f"{self.cdn_url}/covers/{manga_id}/{cover_file}" if cover_file else None
-            
-            # Get available chapters
-            chapters = {}
-            try:
-                aggregate_url = f"{self.api_url}/manga/{manga_id}/aggregate?translatedLanguage[]={self.lang}"
-                agg_response = self.session.get(aggregate_url, headers=self.headers)
-                if agg_response.status_code == 200:
-                    agg_data = agg_response.json()
-                    for volume_key, volume in agg_data.get("volumes", {}).items():
-                        for chapter_key, chapter in volume.get("chapters", {}).items():
-                            chapter_id = chapter.get("id")
-                            chapter_num = chapter_key if chapter_key != "none" else "1"
-                            chapters[f"Chapter {chapter_num}"] = chapter_id
-            except:
-                pass
+        description = attributes.get("description", {}).get(self.lang)
+        if not description:
+            description = attributes.get("description", {}).get("en", "No description available.")
+        
+        cover_file = None
+        for relationship in manga_data.get("relationships", []):
+            if relationship.get("type") == "cover_art":
+                cover_file = relationship.get("attributes", {}).get("fileName")
                 
-            manga_list.append(
-                Manga(
-                    id=manga_id,
-                    url=f"/manga/{manga_id}",
-                    title=title,
-                    author=self._get_creator(manga_data, "author"),
-                    description=description,
-                    poster=cover_url,
-                    chapters=len(chapters) if chapters else 0,
-                    tags=self._get_tags(attributes),
-                    genres=self._get_genres(attributes),
-                    status=attributes.get("status", "ongoing"),
-                    rating=attributes.get("rating", {}).get("bayesian", 0.0),
-                    chapter_ids=chapters
-                )
-            )
-            
-        return manga_list
+        cover_url = f"{self.cdn_url}/covers/{manga_id}/{cover_file}" if cover_file else None
+        
+        return Manga(
+            id=manga_id,
+            url=f"/manga/{manga_id}",
+            title=title,
+            author=self._get_creator(manga_data, "author"),
+            description=description,
+            poster=cover_url,
+            chapters=len(chapters) if chapters else 0,
+            tags=self._get_tags(attributes),
+            genres=self._get_genres(attributes),
+            status=attributes.get("status", "ongoing"),
+            rating=attributes.get("rating", {}).get("bayesian", 0.0),
+            chapter_ids=chapters
+        )
         
     def _get_creator(self, manga_data: Dict[str, Any], creator_type: str) -> str:
         creators = []
@@ -138,9 +229,9 @@ class MangaDex(Scraper):
                     genres.append(name)
         return genres
         
-    def latest_manga(self, page: int = 1) -> List[Manga]:
-        offset = (page - 1) * 12
-        params = {
+    def _latest_params(self, page: int = 1) -> Dict[str, Any]:
+        offset = (page - 1) * 25
+        return {
             "limit": 25,
             "offset": offset,
             "includes[]": "cover_art",
@@ -148,19 +239,19 @@ class MangaDex(Scraper):
             "order[latestUploadedChapter]": "desc",
             "availableTranslatedLanguage[]": self.lang
         }
+
+    async def latest_manga(self, page: int = 1, include_chapters: bool = False) -> List[Manga]:
+        data = await self._request_manga_list(self._latest_params(page))
+        return await self._parse_manga_list(data, include_chapters)
+
+    async def iter_latest_manga(self, page: int = 1, include_chapters: bool = False) -> AsyncIterator[Manga]:
+        data = await self._request_manga_list(self._latest_params(page))
+        async for manga in self._iter_manga_list(data, include_chapters):
+            yield manga
         
-        url = f"{self.api_url}/manga"
-        response = self.session.get(url, params=params, headers=self.headers)
-        
-        if response.status_code != 200:
-            return []
-            
-        data = response.json()
-        return self._parse_manga_list(data)
-        
-    def popular_manga(self, page: int = 1) -> List[Manga]:
-        offset = (page - 1) * 12
-        params = {
+    def _popular_params(self, page: int = 1) -> Dict[str, Any]:
+        offset = (page - 1) * 25
+        return {
             "limit": 25,
             "offset": offset,
             "includes[]": "cover_art",
@@ -168,35 +259,32 @@ class MangaDex(Scraper):
             "order[followedCount]": "desc",
             "availableTranslatedLanguage[]": self.lang
         }
+
+    async def popular_manga(self, page: int = 1, include_chapters: bool = False) -> List[Manga]:
+        data = await self._request_manga_list(self._popular_params(page))
+        return await self._parse_manga_list(data, include_chapters)
+
+    async def iter_popular_manga(self, page: int = 1, include_chapters: bool = False) -> AsyncIterator[Manga]:
+        data = await self._request_manga_list(self._popular_params(page))
+        async for manga in self._iter_manga_list(data, include_chapters):
+            yield manga
         
-        url = f"{self.api_url}/manga"
-        response = self.session.get(url, params=params, headers=self.headers)
-        
-        if response.status_code != 200:
-            return []
-            
-        data = response.json()
-        return self._parse_manga_list(data)
-        
-    def get_manga(self, manga_id: str) -> Manga:
+    async def get_manga(self, manga_id: str) -> Manga:
         url = f"{self.api_url}/manga/{manga_id}?includes[]=cover_art&includes[]=author&includes[]=artist"
-        response = self.session.get(url, headers=self.headers)
-        
-        if response.status_code != 200:
+        data = await self.fetch_json(url)
+        if not data:
             return None
             
-        data = response.json()
-        manga_list = self._parse_manga_list(data)
+        manga_list = await self._parse_manga_list(data, include_chapters=True)
         return manga_list[0] if manga_list else None
         
-    def get_chapter(self, chapter_id: str) -> Chapter:
+    async def get_chapter(self, chapter_id: str) -> Chapter:
         url = f"{self.api_url}/chapter/{chapter_id}"
-        response = self.session.get(url, headers=self.headers)
-        
-        if response.status_code != 200:
+        data = await self.fetch_json(url)
+        if not data:
             return None
             
-        chapter_data = response.json().get("data", {})
+        chapter_data = data.get("data", {})
         attributes = chapter_data.get("attributes", {})
         
         # Get chapter title
@@ -219,11 +307,10 @@ class MangaDex(Scraper):
             
         # Get pages
         at_home_url = f"{self.api_url}/at-home/server/{chapter_id}"
-        at_home_response = self.session.get(at_home_url, headers=self.headers)
+        at_home_data = await self.fetch_json(at_home_url)
         
         pages = []
-        if at_home_response.status_code == 200:
-            at_home_data = at_home_response.json()
+        if at_home_data:
             server = at_home_data.get("baseUrl")
             chapter_hash = at_home_data.get("chapter", {}).get("hash")
             
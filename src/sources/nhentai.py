@@ -1,14 +1,19 @@
 
-import json
 import re
-import time
-import requests
-import cloudscraper
 from typing import List, Dict, Any, Optional
-from bs4 import BeautifulSoup
 from datetime import datetime
+from src.lib.cache import LRUCache
+from src.lib.config import env_int
+from src.lib.ratelimit import RateLimitTimeout
+from src.lib.embedded_json import extract_json_parse
+from src.lib.html import Node, ParseOnly, parse_html
 from src.lib.types import Scraper, Manga, Chapter
 
+# Listings only need the gallery cards; search also keeps the pagination
+# links to tell whether there is a next page.
+LISTING_ONLY = ParseOnly("div", class_="gallery")
+SEARCH_ONLY = ParseOnly(["div", "section"], class_=["gallery", "pagination"])
+
 class NHentai(Scraper):
     def __init__(self):
         super().__init__(
@@ -20,13 +25,6 @@ class NHentai(Scraper):
         self.available_filters = self._get_filters()
         self.available_qualities = []
         self.lang = "all"
-        self.session = cloudscraper.create_scraper(
-            browser={
-                'browser': 'chrome',
-                'platform': 'windows',
-                'mobile': False
-            }
-        )
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
             "Referer": self.base_url,
@@ -40,7 +38,11 @@ class NHentai(Scraper):
             "display_full_title": True,
             "media_server": 1
         }
+        self.api_headers = {**self.headers, "Accept": "application/json"}
         self.id_search_prefix = "id:"
+        # Parsed /g/{id}/ pages shared by details and chapter requests.
+        self.gallery_cache = LRUCache(env_int("NHENTAI_GALLERY_CACHE_SIZE", 512))
+        self.gallery_ttl = env_int("NHENTAI_GALLERY_TTL", 24 * 3600)
         self.image_types = {
             "j": "jpg",
             "p": "png",
@@ -55,15 +57,12 @@ class NHentai(Scraper):
             if page > 1:
                 url += f"?page={page}"
                 
-            response = self.session.get(
-                url,
-                headers=self.headers,
-                timeout=30
-            )
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, "html.parser")
+            soup = self.fetch_html(url, only=LISTING_ONLY)
+            if soup is None:
+                return []
             return self._parse_search_results(soup)
+        except RateLimitTimeout:
+            raise
         except Exception as e:
             pass
             return []
@@ -79,15 +78,12 @@ class NHentai(Scraper):
             if page > 1:
                 url += f"?page={page}"
                 
-            response = self.session.get(
-                url,
-                headers=self.headers,
-                timeout=30
-            )
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, "html.parser")
+            soup = self.fetch_html(url, only=LISTING_ONLY)
+            if soup is None:
+                return []
             return self._parse_search_results(soup)
+        except RateLimitTimeout:
+            raise
         except Exception as e:
             pass
             return []
@@ -110,106 +106,156 @@ class NHentai(Scraper):
             manga_details = self.manga_details_request(query)
             return [manga_details] if manga_details else []
         
-        base_search_url = f"{self.base_url}/search"
-        url_params = {
-            "q": self._build_search_query(query, filters),
-            "page": 1
-        }
+        search_query = self._build_search_query(query, filters)
+        sort = filters.get("sort")
+        favorites_only = filters.get("favorites_only", False)
+        
+        # Favorites need a logged-in session, which only the site has.
+        page_results = None if favorites_only else self._search_page_api(search_query, page, sort)
+        if page_results is None:
+            page_results = self._search_page_html(search_query, page, sort, favorites_only)
+        
+        results, _ = page_results
+        return results
+
+    def _search_page_api(self, search_query: str, page: int, sort: Optional[str] = None) -> Optional[tuple]:
+        """Returns (results, has_next_page), or None if the API request failed."""
+        params = {"query": search_query, "page": page}
+        if sort:
+            params["sort"] = sort
+        
+        data = self._request_api("/galleries/search", params)
+        if data is None or not isinstance(data.get("result"), list):
+            return None
         
-        if "sort" in filters:
-            url_params["sort"] = filters["sort"]
+        results = []
+        for gallery in data["result"]:
+            gallery_id = str(gallery.get("id", ""))
+            if not gallery_id:
+                continue
+            # Search results carry the full gallery, so opening one of them
+            # later doesn't need another request.
+            results.append(self._remember_gallery(gallery_id, gallery)["details"])
         
-        if filters.get("favorites_only", False):
-            base_search_url = f"{self.base_url}/favorites"
+        return results, page < data.get("num_pages", 0)
+
+    def _search_page_html(self, search_query: str, page: int, sort: Optional[str] = None, favorites_only: bool = False) -> tuple:
+        base_search_url = f"{self.base_url}/favorites" if favorites_only else f"{self.base_url}/search"
+        url_params = {"q": search_query, "page": page}
+        if sort:
+            url_params["sort"] = sort
         
         try:
-            all_results = []
-            current_page = 1
-            has_next_page = True
-            
-            while has_next_page:
-                url_params["page"] = current_page
-                response = self.session.get(
-                    base_search_url, 
-                    params=url_params, 
-                    headers=self.headers,
-                    timeout=30
-                )
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.text, "html.parser")
-                page_results = self._parse_search_results(soup)
-                
-                if page_results:
-                    all_results.extend(page_results)
-                    
-                    next_page = soup.select_one("#content > section.pagination > a.next")
-                    if next_page:
-                        current_page += 1
-                    else:
-                        has_next_page = False
-                else:
-                    has_next_page = False
-                
-                if current_page > 5:
-                    break
-            
-            return all_results
-            
+            soup = self.fetch_html(base_search_url, only=SEARCH_ONLY, params=url_params)
+        except RateLimitTimeout:
+            raise
         except Exception as e:
             pass
-            return []
+            return [], False
+        
+        if soup is None:
+            return [], False
+        next_page = soup.select_one("section.pagination > a.next")
+        return self._parse_search_results(soup), next_page is not None
 
     def search_manga(self, query: str, page: int = 1, filters: Optional[Dict[str, Any]] = None) -> List[Manga]:
         manga_list = self.search_manga_request(query, page, filters)
         return [self._convert_to_manga(manga) for manga in manga_list]
 
     def manga_details_request(self, manga_id: str) -> Dict[str, Any]:
-        
-        
-        try:
-            response = self.session.get(
-                f"{self.base_url}/g/{manga_id}/",
-                headers=self.headers,
-                timeout=30
-            )
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, "html.parser")
-            
-            script_data = soup.select_one("#__nuxt")
-            if not script_data:
-                script_data = soup.select_one("script:contains(JSON.parse)")
-            
-            if not script_data:
-                return self._parse_manga_details_html(soup, manga_id)
-            
-            json_match = re.search(r'JSON\.parse\(\s*"(.*)"\s*\)', script_data.string)
-            if not json_match:
-                return self._parse_manga_details_html(soup, manga_id)
-            
-            json_str = json_match.group(1)
-            json_str = re.sub(r'\\u([0-9a-fA-F]{4})', lambda m: chr(int(m.group(1), 16)), json_str)
-            json_str = json_str.replace('\\"', '"').replace('\\\\', '\\')
-            
-            data = json.loads(json_str)
-            return self._parse_manga_details_json(data, manga_id)
-            
-        except Exception as e:
-            pass
-            return {}
+        gallery = self._load_gallery(manga_id)
+        return gallery["details"] if gallery else {}
 
     def get_chapter(self, chapter_id: str) -> Chapter:
-        chapter_data = self._get_pages(chapter_id)
-        page_urls = [page.get("url", "") for page in chapter_data]
-        manga_details = self.manga_details_request(chapter_id)
+        gallery = self._load_gallery(chapter_id) or {"details": {}, "pages": []}
+        page_urls = [page.get("url", "") for page in gallery["pages"]]
         
         return Chapter(
-            title=manga_details.get("title", f"Gallery #{chapter_id}"),
+            title=gallery["details"].get("title", f"Gallery #{chapter_id}"),
             pages=page_urls,
             id=chapter_id
         )
 
+    def _load_gallery(self, gallery_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Fetches a gallery once and returns both the details and the page
+        list, from the JSON API when it answers and from /g/{id}/ otherwise.
+        Galleries don't change after upload, so complete results are
+        memoized across requests.
+        """
+        gallery = self.gallery_cache.get(gallery_id)
+        if gallery is not None:
+            return gallery
+        
+        data = self._request_api(f"/gallery/{gallery_id}")
+        if data:
+            gallery = self._remember_gallery(gallery_id, data)
+            if gallery["pages"]:
+                return gallery
+        
+        # The API is down or blocked; scrape the gallery page instead.
+        try:
+            text = self.fetch_text(f"{self.base_url}/g/{gallery_id}/")
+        except RateLimitTimeout:
+            raise
+        except Exception as e:
+            pass
+            return None
+        
+        if text is None:
+            return None
+        
+        media_server = self.preferences["media_server"]
+        media_server_match = re.search(r'media_server\s*:\s*(\d+)', text)
+        if media_server_match:
+            media_server = int(media_server_match.group(1))
+        
+        data = self._extract_gallery_json(text)
+        pages = []
+        if data:
+            details = self._parse_manga_details_json(data, gallery_id)
+            pages = self._pages_from_json(data, media_server)
+        
+        # Only build the DOM when the embedded JSON is missing or incomplete.
+        if not pages:
+            soup = parse_html(text)
+            if not data:
+                details = self._parse_manga_details_html(soup, gallery_id)
+            pages = self._pages_from_html(soup, media_server)
+        
+        gallery = {"details": details, "pages": pages}
+        if pages:
+            self.gallery_cache.set(gallery_id, gallery, self.gallery_ttl)
+        return gallery
+
+    def _remember_gallery(self, gallery_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        gallery = {
+            "details": self._parse_manga_details_json(data, gallery_id),
+            "pages": self._pages_from_json(data, self.preferences["media_server"])
+        }
+        if gallery["pages"]:
+            self.gallery_cache.set(gallery_id, gallery, self.gallery_ttl)
+        return gallery
+
+    def _request_api(self, path: str, params: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        try:
+            data = self.fetch_json(f"{self.api_url}{path}", params=params, headers=self.api_headers)
+        except RateLimitTimeout:
+            raise
+        except Exception as e:
+            pass
+            return None
+        
+        if not isinstance(data, dict) or "error" in data:
+            return None
+        return data
+
+    def _extract_gallery_json(self, text: str) -> Optional[Dict[str, Any]]:
+        # The gallery is embedded as JSON.parse("..."); read it straight from
+        # the page text rather than hunting through a parsed DOM for it.
+        data = extract_json_parse(text)
+        return data if isinstance(data, dict) else None
+
     def _convert_to_manga(self, manga_dict: Dict[str, Any]) -> Manga:
         if not manga_dict:
             return None
@@ -243,8 +289,8 @@ class NHentai(Scraper):
     def _build_search_query(self, query: str, filters: Dict[str, Any]) -> str:
         search_parts = [query] if query else []
         
-        if self.language != "all" and self.language:
-            search_parts.append(f"language:{self.language}")
+        if self.lang != "all" and self.lang:
+            search_parts.append(f"language:{self.lang}")
         
         for filter_type in ["tag", "category", "artist", "group", "parody", "character"]:
             if filter_type in filters:
@@ -264,7 +310,7 @@ class NHentai(Scraper):
         
         return " ".join(search_parts)
 
-    def _parse_search_results(self, soup: BeautifulSoup) -> List[Dict[str, Any]]:
+    def _parse_search_results(self, soup: Node) -> List[Dict[str, Any]]:
         results = []
         gallery_elements = soup.select(".gallery")
         
@@ -371,7 +417,7 @@ class NHentai(Scraper):
         
         return manga_details
 
-    def _parse_manga_details_html(self, soup: BeautifulSoup, manga_id: str) -> Dict[str, Any]:
+    def _parse_manga_details_html(self, soup: Node, manga_id: str) -> Dict[str, Any]:
         try:
             title_element = soup.select_one("#info > h1")
             title = title_element.text.strip() if title_element else f"Gallery #{manga_id}"
@@ -458,102 +504,69 @@ class NHentai(Scraper):
             }
 
     def _get_pages(self, chapter_id: str) -> List[Dict[str, Any]]:
-        try:
-            response = self.session.get(
-                f"{self.base_url}/g/{chapter_id}/",
-                headers=self.headers,
-                timeout=30
-            )
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, "html.parser")
-            
-            media_id = None
-            pages_data = []
-            
-            media_server = self.preferences["media_server"]
-            media_server_match = re.search(r'media_server\s*:\s*(\d+)', response.text)
-            if media_server_match:
-                media_server = int(media_server_match.group(1))
-            
-            script_data = None
-            for script in soup.select("script"):
-                if script.string and "JSON.parse" in script.string:
-                    script_data = script
+        gallery = self._load_gallery(chapter_id)
+        return gallery["pages"] if gallery else []
+
+    def _pages_from_json(self, data: Dict[str, Any], media_server: int) -> List[Dict[str, Any]]:
+        media_id = data.get("media_id", "")
+        pages = data.get("images", {}).get("pages", [])
+        
+        pages_data = []
+        for i, page in enumerate(pages):
+            page_type = page.get("t", "j")
+            extension = self.image_types.get(page_type, "jpg")
+            pages_data.append({
+                "index": i,
+                "url": f"https://i{media_server}.nhentai.net/galleries/{media_id}/{i + 1}.{extension}"
+            })
+        return pages_data
+
+    def _pages_from_html(self, soup: Node, media_server: int) -> List[Dict[str, Any]]:
+        media_id = None
+        pages_data = []
+        
+        thumb_element = soup.select_one("#cover img")
+        if thumb_element:
+            thumb_url = thumb_element.get("data-src") or thumb_element.get("src") or ""
+            media_id_match = re.search(r'/galleries/(\d+)/', thumb_url)
+            if media_id_match:
+                media_id = media_id_match.group(1)
+        
+        if not media_id:
+            thumb_elements = soup.select(".gallerythumb img")
+            for element in thumb_elements:
+                thumb_url = element.get("data-src") or element.get("src") or ""
+                media_id_match = re.search(r'/galleries/(\d+)/', thumb_url)
+                if media_id_match:
+                    media_id = media_id_match.group(1)
                     break
-                    
-            if script_data:
-                json_match = re.search(r'JSON\.parse\(\s*"(.*)"\s*\)', script_data.string)
-                if json_match:
-                    json_str = json_match.group(1)
-                    json_str = re.sub(r'\\u([0-9a-fA-F]{4})', lambda m: chr(int(m.group(1), 16)), json_str)
-                    json_str = json_str.replace('\\"', '"').replace('\\\\', '\\')
-                    
-                    try:
-                        data = json.loads(json_str)
-                        media_id = data.get("media_id", "")
-                        
-                        images = data.get("images", {})
-                        pages = images.get("pages", [])
-                        
-                        for i, page in enumerate(pages):
-                            page_type = page.get("t", "j")
-                            extension = self.image_types.get(page_type, "jpg")
-                            pages_data.append({
-                                "index": i,
-                                "url": f"https://i{media_server}.nhentai.net/galleries/{media_id}/{i + 1}.{extension}"
-                            })
-                    except Exception as e:
-                        pass
-            
-            if not pages_data:
-                
-                thumb_element = soup.select_one("#cover img")
-                if thumb_element:
-                    thumb_url = thumb_element.get("data-src") or thumb_element.get("src") or ""
-                    media_id_match = re.search(r'/galleries/(\d+)/', thumb_url)
-                    if media_id_match:
-                        media_id = media_id_match.group(1)
-                
-                if not media_id:
-                    thumb_elements = soup.select(".gallerythumb img")
-                    for element in thumb_elements:
-                        thumb_url = element.get("data-src") or element.get("src") or ""
-                        media_id_match = re.search(r'/galleries/(\d+)/', thumb_url)
-                        if media_id_match:
-                            media_id = media_id_match.group(1)
-                            break
-                
-                pages_element = soup.select_one("#info > div")
-                pages_text = pages_element.text if pages_element else ""
-                pages_match = re.search(r'(\d+) pages', pages_text)
-                page_count = int(pages_match.group(1)) if pages_match else 0
-                
-                if not page_count:
-                    page_count = len(soup.select(".gallerythumb"))
+        
+        pages_element = soup.select_one("#info > div")
+        pages_text = pages_element.text if pages_element else ""
+        pages_match = re.search(r'(\d+) pages', pages_text)
+        page_count = int(pages_match.group(1)) if pages_match else 0
+        
+        if not page_count:
+            page_count = len(soup.select(".gallerythumb"))
+        
+        if media_id and page_count:
+            for i in range(page_count):
+                pages_data.append({
+                    "index": i,
+                    "url": f"https://i{media_server}.nhentai.net/galleries/{media_id}/{i + 1}.jpg"
+                })
                 
-                if media_id and page_count:
-                    for i in range(page_count):
-                        pages_data.append({
-                            "index": i,
-                            "url": f"https://i{media_server}.nhentai.net/galleries/{media_id}/{i + 1}.jpg"
-                        })
-                        
-                if not pages_data:
-                    img_elements = soup.select("#image-container img")
-                    for i, img in enumerate(img_elements):
-                        img_url = img.get("src") or img.get("data-src") or ""
-                        if img_url:
-                            pages_data.append({
-                                "index": i,
-                                "url": img_url
-                            })
-            
-            return pages_data
-            
-        except Exception as e:
-            pass
-            return []
+        if not pages_data:
+            img_elements = soup.select("#image-container img")
+            for i, img in enumerate(img_elements):
+                img_url = img.get("src") or img.get("data-src") or ""
+                if img_url:
+                    pages_data.append({
+                        "index": i,
+                        "url": img_url
+                    })
+        
+        return pages_data
 
     def _get_filters(self) -> Dict[str, Any]:
         return {
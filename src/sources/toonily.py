@@ -1,14 +1,31 @@
 
-import json
+import contextvars
 import re
-import time
-import cloudscraper
-from typing import List, Dict, Any, Optional
-from bs4 import BeautifulSoup
-from datetime import datetime
-from src.lib.types import Scraper, Manga, Chapter
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Iterator
+from datetime import datetime, timedelta
+from src.lib.config import env_int
+from src.lib.html import Node, ParseOnly
+from src.lib.types import Scraper, Manga, Chapter, ChapterRecord, chapter_map
+
+# Listing pages only need the manga cards; search results use either layout.
+LISTING_ONLY = ParseOnly("div", class_="page-item-detail")
+SEARCH_ONLY = ParseOnly("div", class_=["c-tabs-item__content", "page-item-detail"])
+
+# Units of relative chapter dates, in seconds.
+RELATIVE_UNITS = (
+    ("second", 1),
+    ("minute", 60),
+    ("hour", 3600),
+    ("day", 86400),
+    ("week", 7 * 86400),
+    ("month", 30 * 86400),
+    ("year", 365 * 86400),
+)
 
 class Toonily(Scraper):
+    listing_options = ("include_chapters",)
+
     def __init__(self):
         super().__init__(
             name="Toonily",
@@ -18,13 +35,12 @@ class Toonily(Scraper):
         )
         self.available_filters = self._get_filters()
         self.lang = "en"
-        self.session = cloudscraper.create_scraper(
-            browser={
-                'browser': 'chrome',
-                'platform': 'windows',
-                'mobile': False
-            }
-        )
+        # Chapter lookups for listings run on their own bounded pool. The
+        # transport's connection pool is sized to match so every worker keeps
+        # its keep-alive connection to toonily.com instead of reconnecting.
+        self.chapter_workers = env_int("TOONILY_CHAPTER_WORKERS", 8)
+        self.chapter_pool = ThreadPoolExecutor(max_workers=max(1, self.chapter_workers), thread_name_prefix="toonily-chapters")
+        self.http_pool_size = self.chapter_workers + 2
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
             "Referer": f"{self.base_url}/",
@@ -39,51 +55,83 @@ class Toonily(Scraper):
         self.date_format = "%b %d, %y"
         self.title_special_characters_regex = re.compile(r"[^a-z0-9]+")
         self.sd_cover_regex = re.compile(r"-[0-9]+x[0-9]+(\.\w+)$")
+        self.chapter_number_regex = re.compile(r"chapter\s*(\d+(?:\.\d+)?)", re.IGNORECASE)
         self.genres_list = []
         self.genres_fetched = False
 
-    def popular_manga_request(self, page: int = 1) -> List[Dict[str, Any]]:
-        url = f"{self.base_url}/{self.manga_sub_string}/page/{page}/?m_orderby=views"
-        
-        response = self.session.get(url, headers=self.headers, cookies=self.cookie)
-        if response.status_code != 200:
+    def _get_soup(self, url: str, method: str = "GET", headers: Optional[Dict[str, str]] = None, only: Optional[ParseOnly] = None) -> Optional[Node]:
+        return self.fetch_html(url, method, only=only, headers=headers, cookies=self.cookie)
+
+    def _popular_url(self, page: int = 1) -> str:
+        return f"{self.base_url}/{self.manga_sub_string}/page/{page}/?m_orderby=views"
+
+    def popular_manga_request(self, page: int = 1, include_chapters: bool = True) -> List[Dict[str, Any]]:
+        soup = self._get_soup(self._popular_url(page), only=LISTING_ONLY)
+        if soup is None:
             return []
         
-        soup = BeautifulSoup(response.text, "html.parser")
-        return self._extract_manga_list(soup)
+        return self._extract_manga_list(soup, include_chapters)
 
-    def popular_manga(self, page: int = 1) -> List[Manga]:
-        manga_list = self.popular_manga_request(page)
+    def popular_manga(self, page: int = 1, include_chapters: bool = True) -> List[Manga]:
+        manga_list = self.popular_manga_request(page, include_chapters)
         return [self._convert_to_manga(manga) for manga in manga_list]
 
-    def latest_manga_request(self, page: int = 1) -> List[Dict[str, Any]]:
-        url = f"{self.base_url}/{self.manga_sub_string}/page/{page}/?m_orderby=latest"
-        
-        response = self.session.get(url, headers=self.headers, cookies=self.cookie)
-        if response.status_code != 200:
+    def iter_popular_manga(self, page: int = 1, include_chapters: bool = True) -> Iterator[Manga]:
+        soup = self._get_soup(self._popular_url(page), only=LISTING_ONLY)
+        if soup is None:
+            return
+        
+        items = self._iter_manga_list(soup)
+        if include_chapters:
+            items = self._with_chapters(items)
+        for manga in items:
+            yield self._convert_to_manga(manga)
+
+    def _latest_url(self, page: int = 1) -> str:
+        return f"{self.base_url}/{self.manga_sub_string}/page/{page}/?m_orderby=latest"
+
+    def latest_manga_request(self, page: int = 1, include_chapters: bool = True) -> List[Dict[str, Any]]:
+        soup = self._get_soup(self._latest_url(page), only=LISTING_ONLY)
+        if soup is None:
             return []
         
-        soup = BeautifulSoup(response.text, "html.parser")
-        return self._extract_manga_list(soup)
+        return self._extract_manga_list(soup, include_chapters)
 
-    def latest_manga(self, page: int = 1) -> List[Manga]:
-        manga_list = self.latest_manga_request(page)
+    def latest_manga(self, page: int = 1, include_chapters: bool = True) -> List[Manga]:
+        manga_list = self.latest_manga_request(page, include_chapters)
         return [self._convert_to_manga(manga) for manga in manga_list]
 
-    def search_manga_request(self, query: str, page: int = 1, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    def iter_latest_manga(self, page: int = 1, include_chapters: bool = True) -> Iterator[Manga]:
+        soup = self._get_soup(self._latest_url(page), only=LISTING_ONLY)
+        if soup is None:
+            return
+        
+        items = self._iter_manga_list(soup)
+        if include_chapters:
+            items = self._with_chapters(items)
+        for manga in items:
+            yield self._convert_to_manga(manga)
+
+    def search_manga_request(self, query: str, page: int = 1, filters: Optional[Dict[str, Any]] = None, include_chapters: bool = True) -> List[Dict[str, Any]]:
         # Clean query
         query = self.title_special_characters_regex.sub(" ", query).strip()
         
         if query.startswith("id:"):
             slug = query[3:]
             url = f"{self.base_url}/{self.manga_sub_string}/{slug}/"
-            response = self.session.get(url, headers=self.headers, cookies=self.cookie)
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, "html.parser")
+            soup = self._get_soup(url)
+            if soup is not None:
                 manga_details = self._extract_manga_details(soup, slug)
                 return [manga_details] if manga_details else []
             return []
         
+        soup = self._get_soup(self._search_url(query, page, filters), only=SEARCH_ONLY)
+        if soup is None:
+            return []
+        
+        return self._extract_search_manga_list(soup, include_chapters)
+
+    def _search_url(self, query: str, page: int = 1, filters: Optional[Dict[str, Any]] = None) -> str:
         url = f"{self.base_url}/?s={query}&post_type=wp-manga"
         
         if filters:
@@ -108,26 +156,36 @@ class Toonily(Scraper):
         if page > 1:
             url = f"{url}&paged={page}"
         
-        response = self.session.get(url, headers=self.headers, cookies=self.cookie)
-        if response.status_code != 200:
-            return []
-        
-        soup = BeautifulSoup(response.text, "html.parser")
-        return self._extract_search_manga_list(soup)
+        return url
 
-    def search_manga(self, query: str, page: int = 1, filters: Optional[Dict[str, Any]] = None) -> List[Manga]:
-        manga_list = self.search_manga_request(query, page, filters)
+    def search_manga(self, query: str, page: int = 1, filters: Optional[Dict[str, Any]] = None, include_chapters: bool = True) -> List[Manga]:
+        manga_list = self.search_manga_request(query, page, filters, include_chapters)
         return [self._convert_to_manga(manga) for manga in manga_list]
 
+    def iter_search_manga(self, query: str, page: int = 1, filters: Optional[Dict[str, Any]] = None, include_chapters: bool = True) -> Iterator[Manga]:
+        clean_query = self.title_special_characters_regex.sub(" ", query).strip()
+        if clean_query.startswith("id:"):
+            yield from self.search_manga(query, page, filters, include_chapters)
+            return
+        
+        soup = self._get_soup(self._search_url(clean_query, page, filters), only=SEARCH_ONLY)
+        if soup is None:
+            return
+        
+        items = self._iter_search_manga_list(soup)
+        if include_chapters:
+            items = self._with_chapters(items)
+        for manga in items:
+            yield self._convert_to_manga(manga)
+
     def manga_details_request(self, manga_id: str) -> Dict[str, Any]:
         # Ensure URL uses the correct manga subdirectory
         url = f"{self.base_url}/{self.manga_sub_string}/{manga_id}/"
         
-        response = self.session.get(url, headers=self.headers, cookies=self.cookie)
-        if response.status_code != 200:
+        soup = self._get_soup(url)
+        if soup is None:
             return {}
         
-        soup = BeautifulSoup(response.text, "html.parser")
         return self._extract_manga_details(soup, manga_id)
 
     def get_manga(self, manga_id: str) -> Manga:
@@ -137,15 +195,14 @@ class Toonily(Scraper):
     def get_chapter(self, chapter_id: str) -> Chapter:
         url = f"{self.base_url}/{chapter_id}"
         
-        response = self.session.get(url, headers=self.headers, cookies=self.cookie)
-        if response.status_code != 200:
+        soup = self._get_soup(url)
+        if soup is None:
             return Chapter(
                 title="Error loading chapter",
                 pages=[],
                 id=chapter_id
             )
         
-        soup = BeautifulSoup(response.text, "html.parser")
         
         # Get chapter title
         title_element = soup.select_one("ol.breadcrumb li.active")
@@ -155,12 +212,10 @@ class Toonily(Scraper):
         pages = []
         images = soup.select("div.page-break img, .reading-content .text-left img")
         
-        for index, image in enumerate(images):
+        for image in images:
             image_url = image.get("data-src") or image.get("src") or ""
             if image_url and "images/default-image" not in image_url:
                 pages.append(image_url)
-                # Save images to test directory
-                self._save_image_for_testing(image_url, chapter_id, index)
         
         return Chapter(
             title=title,
@@ -168,47 +223,6 @@ class Toonily(Scraper):
             id=chapter_id
         )
         
-    def _save_image_for_testing(self, image_url: str, chapter_id: str, index: int) -> None:
-        """
-        Save an image from a CDN URL to the test directory for testing purposes.
-        
-        Args:
-            image_url (str): The URL of the image to save
-            chapter_id (str): The chapter ID to use in the filename
-            index (int): The index of the image in the chapter
-        """
-        import os
-        import requests
-        import shutil
-        from pathlib import Path
-        
-        # Create test_img directory if it doesn't exist
-        test_dir = Path("test_img")
-        if not test_dir.exists():
-            test_dir.mkdir(parents=True, exist_ok=True)
-            
-        # Clean chapter_id for filename (remove slashes)
-        clean_chapter_id = chapter_id.replace("/", "_").replace("\\", "_")
-        
-        # Determine file extension from URL
-        file_ext = os.path.splitext(image_url)[1]
-        if not file_ext:
-            file_ext = ".jpg"  # Default to jpg if no extension found
-            
-        # Create a filename based on chapter and image index
-        filename = f"{clean_chapter_id}_page_{index:03d}{file_ext}"
-        file_path = test_dir / filename
-        
-        try:
-            # Download the image with a streaming request
-            with requests.get(image_url, stream=True, headers=self.headers) as r:
-                r.raise_for_status()
-                with open(file_path, 'wb') as f:
-                    shutil.copyfileobj(r.raw, f)
-            print(f"Saved image to {file_path}")
-        except Exception as e:
-            print(f"Error saving image {image_url}: {e}")
-
     def _convert_to_manga(self, manga_dict: Dict[str, Any]) -> Manga:
         if not manga_dict:
             return None
@@ -237,8 +251,13 @@ class Toonily(Scraper):
             status=status
         )
 
-    def _extract_manga_list(self, soup: BeautifulSoup) -> List[Dict[str, Any]]:
-        manga_list = []
+    def _extract_manga_list(self, soup: Node, include_chapters: bool = True) -> List[Dict[str, Any]]:
+        items = self._iter_manga_list(soup)
+        if include_chapters:
+            items = self._with_chapters(items)
+        return list(items)
+
+    def _iter_manga_list(self, soup: Node) -> Iterator[Dict[str, Any]]:
         manga_elements = soup.select("div.page-item-detail.manga")
         
         for element in manga_elements:
@@ -258,27 +277,50 @@ class Toonily(Scraper):
             if thumbnail_url and self.sd_cover_regex.search(thumbnail_url):
                 thumbnail_url = self.sd_cover_regex.sub(r"\1", thumbnail_url)
             
-            # Get chapters for this manga
-            chapters = {}
-            try:
-                chapters = self._fetch_chapter_list(manga_id)
-            except Exception:
-                pass
-            
+            # Chapters are filled in separately, see _with_chapters
             manga = {
                 "id": manga_id,
                 "title": title,
                 "url": url,
                 "thumbnail_url": thumbnail_url,
-                "chapters": chapters
+                "chapters": {}
             }
             
-            manga_list.append(manga)
-        
-        return manga_list
+            yield manga
 
-    def _extract_search_manga_list(self, soup: BeautifulSoup) -> List[Dict[str, Any]]:
-        manga_list = []
+    def _extract_search_manga_list(self, soup: Node, include_chapters: bool = True) -> List[Dict[str, Any]]:
+        items = self._iter_search_manga_list(soup)
+        if include_chapters:
+            items = self._with_chapters(items)
+        return list(items)
+
+    def _with_chapters(self, items: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Fills in "chapters" for listing items. Each lookup is a GET of the
+        series page plus a POST to ajax/chapters, so they all go to the
+        chapter pool at once and items are yielded in order as they finish.
+        """
+        items = list(items)
+        # Each lookup runs in a copy of the caller's context, so the circuit
+        # breaker still sees its responses and rate-limit waits.
+        futures = [
+            self.chapter_pool.submit(contextvars.copy_context().run, self._fetch_chapter_list, item["id"])
+            for item in items
+        ]
+        try:
+            for item, future in zip(items, futures):
+                try:
+                    item["chapters"] = future.result()
+                except Exception:
+                    pass
+                yield item
+        finally:
+            # The consumer stopped early (e.g. a closed stream); drop
+            # lookups that have not started yet.
+            for future in futures:
+                future.cancel()
+
+    def _iter_search_manga_list(self, soup: Node) -> Iterator[Dict[str, Any]]:
         manga_elements = soup.select("div.c-tabs-item__content")
         
         # If no results with the first selector, try the alternative
@@ -302,26 +344,18 @@ class Toonily(Scraper):
             if thumbnail_url and self.sd_cover_regex.search(thumbnail_url):
                 thumbnail_url = self.sd_cover_regex.sub(r"\1", thumbnail_url)
             
-            # Get chapters for this manga
-            chapters = {}
-            try:
-                chapters = self._fetch_chapter_list(manga_id)
-            except Exception:
-                pass
-            
+            # Chapters are filled in separately, see _with_chapters
             manga = {
                 "id": manga_id,
                 "title": title,
                 "url": url,
                 "thumbnail_url": thumbnail_url,
-                "chapters": chapters
+                "chapters": {}
             }
             
-            manga_list.append(manga)
-        
-        return manga_list
+            yield manga
 
-    def _extract_manga_details(self, soup: BeautifulSoup, manga_id: str) -> Dict[str, Any]:
+    def _extract_manga_details(self, soup: Node, manga_id: str) -> Dict[str, Any]:
         # Title
         title_element = soup.select_one("div.post-title h1, div.post-title h3")
         title = title_element.text.strip() if title_element else f"Series {manga_id}"
@@ -386,9 +420,8 @@ class Toonily(Scraper):
             manga_url = self.base_url + soup.select_one("meta[property='og:url']").get("content", "").replace(self.base_url, "")
             ajax_url = f"{manga_url}/ajax/chapters"
             
-            response = self.session.post(ajax_url, headers={**self.headers, "X-Requested-With": "XMLHttpRequest"}, cookies=self.cookie)
-            if response.status_code == 200:
-                chapters_soup = BeautifulSoup(response.text, "html.parser")
+            chapters_soup = self._get_soup(ajax_url, "POST", headers={"X-Requested-With": "XMLHttpRequest"})
+            if chapters_soup is not None:
                 chapter_elements = chapters_soup.select("li.wp-manga-chapter")
                 
                 for element in chapter_elements:
@@ -411,93 +444,82 @@ class Toonily(Scraper):
             "chapters": chapters
         }
 
+    def get_chapter_list(self, manga_id: str) -> List[ChapterRecord]:
+        return self._fetch_chapter_records(manga_id)
+
     def _fetch_chapter_list(self, manga_id: str) -> Dict[str, str]:
         """Fetch chapters for a manga using its ID"""
-        chapters = {}
-        
+        return chapter_map(self._fetch_chapter_records(manga_id))
+
+    def _fetch_chapter_records(self, manga_id: str) -> List[ChapterRecord]:
         # Make sure URL uses the correct manga subdirectory
         url = f"{self.base_url}/{self.manga_sub_string}/{manga_id}/"
         
-        response = self.session.get(url, headers=self.headers, cookies=self.cookie)
-        if response.status_code != 200:
-            return chapters
+        soup = self._get_soup(url)
+        if soup is None:
+            return []
         
-        soup = BeautifulSoup(response.text, "html.parser")
         chapters_wrapper = soup.select("div[id^=manga-chapters-holder]")
         
+        records = []
         if chapters_wrapper:
             ajax_url = f"{url}ajax/chapters"
             
-            ajax_response = self.session.post(
-                ajax_url, 
-                headers={**self.headers, "X-Requested-With": "XMLHttpRequest"}, 
-                cookies=self.cookie
-            )
-            
-            if ajax_response.status_code == 200:
-                chapters_soup = BeautifulSoup(ajax_response.text, "html.parser")
-                chapter_elements = chapters_soup.select("li.wp-manga-chapter")
-                
-                for element in chapter_elements:
-                    chapter_link = element.select_one("a")
-                    if chapter_link:
-                        chapter_url = chapter_link.get("href", "").replace(self.base_url, "")
-                        chapter_name = chapter_link.text.strip()
-                        chapters[chapter_name] = chapter_url
+            chapters_soup = self._get_soup(ajax_url, "POST", headers={"X-Requested-With": "XMLHttpRequest"})
+            if chapters_soup is not None:
+                records = self._parse_chapter_elements(chapters_soup.select("li.wp-manga-chapter"))
         
         # If we didn't get chapters from AJAX, try to get them directly from the page
-        if not chapters:
-            chapter_elements = soup.select("li.wp-manga-chapter")
-            for element in chapter_elements:
-                chapter_link = element.select_one("a")
-                if chapter_link:
-                    chapter_url = chapter_link.get("href", "").replace(self.base_url, "")
-                    chapter_name = chapter_link.text.strip()
-                    chapters[chapter_name] = chapter_url
+        if not records:
+            records = self._parse_chapter_elements(soup.select("li.wp-manga-chapter"))
             
-        return chapters
+        return records
+
+    def _parse_chapter_elements(self, elements) -> List[ChapterRecord]:
+        records = []
+        for element in elements:
+            chapter_link = element.select_one("a")
+            if not chapter_link:
+                continue
+            
+            chapter_name = chapter_link.text.strip()
+            number = self.chapter_number_regex.search(chapter_name)
+            date_element = element.select_one("span.chapter-release-date")
+            
+            records.append(ChapterRecord(
+                id=chapter_link.get("href", "").replace(self.base_url, ""),
+                name=chapter_name,
+                number=float(number.group(1)) if number else None,
+                uploaded=self._parse_date(date_element.text.strip()) or None if date_element else None
+            ))
+        return records
         
 
     def _parse_date(self, date_string: str) -> int:
         if not date_string or date_string.lower() == "updating":
             return 0
         
-        # Handle "today", "yesterday", etc.
+        date_string = date_string.lower()
         now = datetime.now()
+        today = datetime(now.year, now.month, now.day)
         
-        if "today" in date_string.lower():
-            today = datetime(now.year, now.month, now.day)
+        if "today" in date_string:
             return int(today.timestamp() * 1000)
         
-        if "yesterday" in date_string.lower():
-            yesterday = datetime(now.year, now.month, now.day)
-            yesterday = yesterday.replace(day=yesterday.day - 1)
-            return int(yesterday.timestamp() * 1000)
+        if "yesterday" in date_string:
+            return int((today - timedelta(days=1)).timestamp() * 1000)
         
-        if "ago" in date_string.lower():
-            # Parse relative date
+        if "ago" in date_string:
+            # Relative dates ("40 days ago"); months and years are approximate.
             number = re.search(r"(\d+)", date_string)
             if not number:
                 return 0
             
             num = int(number.group(1))
-            
-            if "day" in date_string.lower():
-                delta = now.replace(day=now.day - num)
-            elif "hour" in date_string.lower():
-                delta = now.replace(hour=now.hour - num)
-            elif "minute" in date_string.lower():
-                delta = now.replace(minute=now.minute - num)
-            elif "second" in date_string.lower():
-                delta = now.replace(second=now.second - num)
-            elif "week" in date_string.lower():
-                delta = now.replace(day=now.day - (num * 7))
-            elif "month" in date_string.lower():
-                delta = now.replace(month=now.month - num)
-            else:
-                return 0
-                
-            return int(delta.timestamp() * 1000)
+            for unit, seconds in RELATIVE_UNITS:
+                if unit in date_string:
+                    return int((now - timedelta(seconds=num * seconds)).timestamp() * 1000)
+            return 0
             
         # Try to parse with date format
         try:
@@ -0,0 +1,102 @@
+import asyncio
+import os
+
+from src.lib import archiver as archiver_module
+from src.lib.archiver import ByteBudget, ChapterArchiver, create_archiver
+
+
+class FakeResponse():
+    def __init__(self, body: bytes):
+        self.body = body
+        self.headers = {"content-length": str(len(body))}
+
+    def raise_for_status(self):
+        pass
+
+    async def aread(self) -> bytes:
+        return self.body
+
+
+class FakeStream():
+    def __init__(self, response):
+        self.response = response
+
+    async def __aenter__(self):
+        return self.response
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeClient():
+    def __init__(self):
+        self.urls = []
+
+    def stream(self, method, url, headers=None):
+        self.urls.append(url)
+        return FakeStream(FakeResponse(url.encode()))
+
+
+def test_archives_pages_once(tmp_path, monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr(archiver_module, "get_async_client", lambda: client)
+    archiver = ChapterArchiver(str(tmp_path), concurrency=2)
+    pages = ["https://cdn.example/1.png?x=1", "https://cdn.example/2.webp", "https://cdn.example/3"]
+
+    async def main():
+        assert archiver.schedule("toonily", "serie/x/chapter-1/", pages)
+        # Already running.
+        assert not archiver.schedule("toonily", "serie/x/chapter-1/", pages)
+        await asyncio.gather(*archiver._tasks)
+        # Recently archived.
+        assert not archiver.schedule("toonily", "serie/x/chapter-1/", pages)
+
+    asyncio.run(main())
+    directory = archiver.chapter_dir("toonily", "serie/x/chapter-1/")
+    assert directory == os.path.join(str(tmp_path), "toonily", "serie_x_chapter-1")
+    assert sorted(os.listdir(directory)) == ["000.png", "001.webp", "002.jpg"]
+    with open(os.path.join(directory, "001.webp"), "rb") as f:
+        assert f.read() == b"https://cdn.example/2.webp"
+    assert archiver.pages_written == 3
+    assert archiver.bytes_written == sum(len(url) for url in pages)
+    assert archiver.stats()["running"] == 0
+
+
+def test_existing_pages_are_skipped(tmp_path, monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr(archiver_module, "get_async_client", lambda: client)
+    archiver = ChapterArchiver(str(tmp_path))
+    directory = archiver.chapter_dir("comick", "abc")
+    os.makedirs(directory)
+    open(os.path.join(directory, "000.jpg"), "wb").close()
+
+    async def main():
+        archiver.schedule("comick", "abc", ["https://cdn.example/a.jpg", "https://cdn.example/b.jpg"])
+        await asyncio.gather(*archiver._tasks)
+
+    asyncio.run(main())
+    assert client.urls == ["https://cdn.example/b.jpg"]
+    assert archiver.pages_skipped == 1
+
+
+def test_byte_budget_lets_an_oversized_item_through_alone():
+    async def main():
+        budget = ByteBudget(10)
+        await budget.acquire(6)
+        waiting = asyncio.ensure_future(budget.acquire(6))
+        await asyncio.sleep(0)
+        assert not waiting.done()
+        await budget.release(6)
+        await asyncio.wait_for(waiting, 1)
+        await budget.release(6)
+        await asyncio.wait_for(budget.acquire(100), 1)
+        return budget.in_flight
+
+    assert asyncio.run(main()) == 100
+
+
+def test_archiver_is_opt_in(monkeypatch, tmp_path):
+    monkeypatch.delenv("CHAPTER_ARCHIVE_DIR", raising=False)
+    assert create_archiver() is None
+    monkeypatch.setenv("CHAPTER_ARCHIVE_DIR", str(tmp_path))
+    assert create_archiver().root == str(tmp_path)
@@ -0,0 +1,120 @@
+import time
+
+import pytest
+
+from src.lib.breaker import CLOSED, HALF_OPEN, OPEN, CallOutcome, CircuitBreaker, CircuitOpenError, note_response
+
+
+def open_breaker(**options) -> CircuitBreaker:
+    breaker = CircuitBreaker("test", window=2, min_calls=2, failure_rate=0.5, open_seconds=0.05, **options)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record(False)
+    assert breaker.state == OPEN
+    return breaker
+
+
+def test_opens_after_failure_rate_and_rejects():
+    breaker = open_breaker()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.rejected == 1
+
+
+def test_half_open_probe_success_closes():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time.
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record(True, 0.01)
+    assert breaker.state == CLOSED
+    breaker.before_call()
+
+
+def test_half_open_probe_failure_reopens():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record(False)
+    assert breaker.state == OPEN
+    assert breaker.opened == 2
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_slow_probe_reopens():
+    breaker = open_breaker(slow_call_seconds=1.0)
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record(True, 2.0)
+    assert breaker.state == OPEN
+
+
+def test_cancelled_probe_frees_the_slot():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.cancel()
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+
+
+def test_check_does_not_claim_the_probe():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    breaker.check()
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+
+
+def test_call_outcome_counts_upstream_errors():
+    def scrape():
+        note_response("s", "GET", "u", 503, 0.1, 0)
+        note_response("s", "GET", "u", None, 0.1, 0)
+        return []
+
+    call = CallOutcome()
+    assert call.wrap(scrape)() == []
+    assert call.failed
+
+    def recovers():
+        note_response("s", "GET", "u", 503, 0.1, 0)
+        note_response("s", "GET", "u", 200, 0.1, 0)
+
+    call = CallOutcome()
+    call.wrap(recovers)()
+    assert not call.failed
+
+
+def test_call_outcome_ignores_responses_outside_the_call():
+    call = CallOutcome()
+    note_response("s", "GET", "u", 500, 0.1, 0)
+    call.wrap(lambda: None)()
+    assert not call.failed
+    assert call.duration < 1
+
+
+def test_call_outcome_follows_toonily_chapter_workers():
+    from src.lib.breaker import note_wait
+    from src.sources.toonily import Toonily
+
+    toonily = Toonily()
+
+    def fetch_chapter_list(manga_id):
+        note_wait(0.5)
+        note_response("toonily", "GET", manga_id, None, 0.1, 0)
+        return {}
+
+    toonily._fetch_chapter_list = fetch_chapter_list
+    call = CallOutcome()
+    try:
+        items = call.wrap(lambda: list(toonily._with_chapters({"id": str(n)} for n in range(20))))()
+    finally:
+        toonily.chapter_pool.shutdown()
+    assert len(items) == 20
+    assert call.errors == 20
+    assert call.failed
+    assert call.waited == 10
@@ -0,0 +1,68 @@
+import time
+
+from src.lib.cache import LRUCache, SQLiteStore, TieredCache, deserialize, make_key, serialize
+from src.lib.types import Chapter, ChapterRecord, Manga
+
+
+def test_make_key_collapses_whitespace():
+    assert make_key("Comick", "popular_manga", (1,), {"include_chapters": True}) == make_key("comick", "popular_manga", (1,), {"include_chapters": True})
+    assert make_key("s", "get_manga", ("  a \t b ",)) == make_key("s", "get_manga", ("a b",))
+
+
+def test_make_key_casefolds_search_queries_only():
+    assert make_key("s", "search_manga", ("One  Piece", 1)) == make_key("s", "search_manga", ("one piece", 1))
+    assert make_key("s", "get_manga", ("AbC",)) != make_key("s", "get_manga", ("abc",))
+
+
+def test_make_key_ignores_kwarg_order():
+    assert make_key("s", "op", (), {"a": 1, "b": "x"}) == make_key("s", "op", (), {"b": "x", "a": 1})
+
+
+def test_make_key_separates_sources_and_operations():
+    assert make_key("a", "op", (1,)) != make_key("b", "op", (1,))
+    assert make_key("a", "op", (1,)) != make_key("a", "other", (1,))
+
+
+def test_serialize_round_trip():
+    manga = Manga("1", "https://example.com/1", "Title", "Author", "Text", "poster.jpg", 2, chapter_ids={"Ch 1": "c1"})
+    value = [manga, Chapter("Ch 1", ["p1", "p2"], "c1"), ChapterRecord("c1", "Ch 1", number=1.0), None, {"n": 3}]
+    restored = deserialize(serialize(value))
+    assert isinstance(restored[0], Manga)
+    assert restored[0].get() == manga.get()
+    assert restored[1].get() == value[1].get()
+    assert restored[2].get() == value[2].get()
+    assert restored[3:] == [None, {"n": 3}]
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.set("a", 1, 60)
+    cache.set("b", 2, 60)
+    cache.get("a")
+    cache.set("c", 3, 60)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.evictions == 1
+
+
+def test_sqlite_store_round_trip(tmp_path):
+    store = SQLiteStore(str(tmp_path / "cache.sqlite3"))
+    now = time.time()
+    store.set("k", [Chapter("t", ["p"], "id")], now + 60, now + 120)
+    value, expires_at, stale_until = store.get_with_expiry("k")
+    assert value[0].get() == {"id": "id", "title": "t", "total_pages": 1, "pages": ["p"]}
+    assert (tmp_path / "cache.sqlite3").stat().st_mode & 0o077 == 0
+
+
+def test_tiered_cache_promotes_disk_hits(tmp_path):
+    cache = TieredCache(LRUCache(), SQLiteStore(str(tmp_path / "cache.sqlite3")))
+    cache.set("k", {"v": 1}, 60)
+    cache.memory.clear()
+    assert cache.get_entry("k") == ({"v": 1}, True)
+    assert cache.memory.get("k") == {"v": 1}
+
+
+def test_make_key_keeps_the_case_of_id_lookups():
+    assert make_key("comick", "search_manga", ("id:AbCd", 1)) != make_key("comick", "search_manga", ("id:abcd", 1))
+    assert make_key("comick", "search_manga", ("ID:AbCd", 1)) != make_key("comick", "search_manga", ("id:AbCd", 1))
+    assert make_key("comick", "search_manga", (" id:AbCd ", 1)) == make_key("comick", "search_manga", ("id:AbCd", 1))
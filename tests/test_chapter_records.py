@@ -0,0 +1,100 @@
+import time
+from datetime import datetime
+
+import pytest
+
+from src.sources.mangadex import MangaDex
+from src.sources.toonily import Toonily
+
+
+class FakeNode():
+    """The slice of the parsed-node API _parse_chapter_elements reads."""
+
+    def __init__(self, text: str = "", attrs=None, children=None):
+        self.text = text
+        self.attrs = attrs or {}
+        self.children = children or {}
+
+    def get(self, name, default=None):
+        return self.attrs.get(name, default)
+
+    def select_one(self, selector):
+        return self.children.get(selector)
+
+
+def chapter_row(name: str, href: str, date: str) -> FakeNode:
+    return FakeNode(children={
+        "a": FakeNode(name, {"href": href}),
+        "span.chapter-release-date": FakeNode(f" {date} "),
+    })
+
+
+@pytest.fixture
+def toonily():
+    scraper = Toonily()
+    yield scraper
+    scraper.chapter_pool.shutdown()
+
+
+def days_ago(timestamp_ms: int) -> float:
+    return (time.time() - timestamp_ms / 1000) / 86400
+
+
+@pytest.mark.parametrize("date, days", [
+    ("40 days ago", 40),
+    ("30 hours ago", 1.25),
+    ("90 minutes ago", 90 / 1440),
+    ("3 weeks ago", 21),
+    ("2 months ago", 60),
+])
+def test_toonily_relative_dates(toonily, date, days):
+    assert days_ago(toonily._parse_date(date)) == pytest.approx(days, abs=0.01)
+
+
+def test_toonily_absolute_and_unknown_dates(toonily):
+    assert toonily._parse_date("Jan 05, 24") == int(datetime(2024, 1, 5).timestamp() * 1000)
+    assert 1 <= days_ago(toonily._parse_date("Yesterday")) < 2
+    assert toonily._parse_date("updating") == 0
+    assert toonily._parse_date("some day ago") == 0
+    assert toonily._parse_date("") == 0
+
+
+def test_toonily_chapter_rows(toonily):
+    rows = [
+        chapter_row("Chapter 12.5", "https://toonily.com/serie/x/chapter-12-5/", "40 days ago"),
+        chapter_row("Notice", "https://toonily.com/serie/x/notice/", "updating"),
+        FakeNode(),
+    ]
+    records = toonily._parse_chapter_elements(rows)
+    assert [record.get()["id"] for record in records] == ["/serie/x/chapter-12-5/", "/serie/x/notice/"]
+    assert records[0].number == 12.5
+    assert days_ago(records[0].uploaded) == pytest.approx(40, abs=0.01)
+    assert records[1].number is None
+    assert records[1].uploaded is None
+
+
+def test_mangadex_chapter_record():
+    record = MangaDex()._build_chapter_record({
+        "id": "c1",
+        "attributes": {"chapter": "10.5", "volume": "2", "title": "Return", "publishAt": "2024-01-05T00:00:00+00:00"},
+        "relationships": [
+            {"type": "manga"},
+            {"type": "scanlation_group", "attributes": {"name": "Group"}},
+        ],
+    })
+    assert record.get() == {
+        "id": "c1",
+        "name": "Chapter 10.5: Return",
+        "number": 10.5,
+        "volume": 2.0,
+        "uploaded": 1704412800000,
+        "scanlator": "Group",
+    }
+
+
+def test_mangadex_oneshot_record():
+    record = MangaDex()._build_chapter_record({"id": "c2", "attributes": {"chapter": None, "publishAt": "not a date"}})
+    assert record.name == "Oneshot"
+    assert record.number is None
+    assert record.uploaded is None
+    assert record.scanlator is None
@@ -0,0 +1,49 @@
+import time
+from http.cookiejar import Cookie, CookieJar
+
+from src.lib.clearance import ClearanceStore
+
+
+class FakeJar(CookieJar):
+    """CookieJar plus the `set` helper requests' jar adds."""
+
+    def set(self, name, value, domain="", path="/", secure=False, expires=None):
+        self.set_cookie(Cookie(0, name, value, None, False, domain, bool(domain), domain.startswith("."), path, True, secure, expires, False, None, None, {}))
+
+
+class FakeSession():
+    def __init__(self, user_agent: str):
+        self.headers = {"User-Agent": user_agent}
+        self.cookies = FakeJar()
+
+
+def test_saves_the_user_agent_that_was_sent(tmp_path):
+    store = ClearanceStore(str(tmp_path / "clearance.sqlite3"))
+    session = FakeSession("randomized session agent")
+    session.cookies.set("cf_clearance", "token", domain="toonily.com", expires=int(time.time()) + 3600)
+    assert store.save("toonily", session, "Chrome/119 sent by the scraper")
+
+    restored = FakeSession("another random agent")
+    assert store.load("toonily", restored) == 1
+    assert restored.headers["User-Agent"] == "Chrome/119 sent by the scraper"
+    assert [cookie.value for cookie in restored.cookies] == ["token"]
+
+
+def test_unchanged_jar_is_not_rewritten(tmp_path):
+    store = ClearanceStore(str(tmp_path / "clearance.sqlite3"))
+    session = FakeSession("agent")
+    session.cookies.set("cf_clearance", "token", domain="toonily.com", expires=int(time.time()) + 3600)
+    assert store.save("toonily", session)
+    assert not store.save("toonily", session)
+    assert store.saves == 1
+
+
+def test_expired_cookies_are_not_loaded(tmp_path):
+    store = ClearanceStore(str(tmp_path / "clearance.sqlite3"))
+    session = FakeSession("agent")
+    session.cookies.set("cf_clearance", "token", domain="toonily.com", expires=int(time.time()) + 1)
+    store.save("toonily", session)
+    time.sleep(1.1)
+    restored = FakeSession("fresh")
+    assert store.load("toonily", restored) == 0
+    assert restored.headers["User-Agent"] == "fresh"
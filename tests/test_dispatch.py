@@ -0,0 +1,74 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.lib.dispatch import Dispatcher, SourceBusyError
+
+
+def test_blocking_calls_run_on_the_source_pool():
+    dispatcher = Dispatcher(["toonily"], max_workers=2, queue_limit=0)
+    try:
+        name = asyncio.run(dispatcher.run("Toonily", lambda: threading.current_thread().name))
+    finally:
+        dispatcher.shutdown()
+    assert name.startswith("scraper-toonily")
+
+
+def test_full_pool_rejects_instead_of_queueing():
+    dispatcher = Dispatcher(max_workers=1, queue_limit=1)
+    release = threading.Event()
+
+    async def main():
+        running = [asyncio.ensure_future(dispatcher.run("slow", release.wait, 2)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        with pytest.raises(SourceBusyError):
+            await dispatcher.run("slow", release.wait, 2)
+        # Other sources have their own pools.
+        assert await dispatcher.run("other", lambda: "ok") == "ok"
+        stats = dispatcher.stats()["slow"]
+        release.set()
+        await asyncio.gather(*running)
+        return stats
+
+    try:
+        stats = asyncio.run(main())
+    finally:
+        dispatcher.shutdown()
+    assert stats["running"] == 1
+    assert stats["queued"] == 1
+    assert stats["rejected"] == 1
+
+
+def test_coroutines_are_awaited_on_the_loop():
+    dispatcher = Dispatcher()
+
+    async def fetch(value):
+        await asyncio.sleep(0)
+        return threading.current_thread() is threading.main_thread(), value
+
+    try:
+        assert asyncio.run(dispatcher.run("mangadex", fetch, 3)) == (True, 3)
+    finally:
+        dispatcher.shutdown()
+
+
+def test_stream_yields_items_and_raises_errors():
+    dispatcher = Dispatcher()
+
+    def items():
+        yield 1
+        yield 2
+        raise ValueError("page 3 failed")
+
+    async def main():
+        received = []
+        with pytest.raises(ValueError):
+            async for item in dispatcher.stream("toonily", items):
+                received.append(item)
+        return received
+
+    try:
+        assert asyncio.run(main()) == [1, 2]
+    finally:
+        dispatcher.shutdown()
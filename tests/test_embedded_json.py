@@ -0,0 +1,51 @@
+from src.lib.embedded_json import decode_string_literal, extract_json_parse, find_string_literal
+
+
+def test_json_unicode_escape():
+    assert decode_string_literal(r"\u0041BC") == "ABC"
+
+
+def test_escaped_backslash_before_u_stays_literal():
+    assert decode_string_literal(r"\\u0041") == "\\u0041"
+
+
+def test_js_hex_escape():
+    assert decode_string_literal(r"\x41\x62") == "Ab"
+    assert decode_string_literal(r"\\x41") == "\\x41"
+
+
+def test_js_single_quote_and_nul_escapes():
+    assert decode_string_literal(r"it\'s") == "it's"
+    assert decode_string_literal(r"a\0b") == "a\x00b"
+
+
+def test_escaped_double_quotes():
+    body = find_string_literal(r'x = "say \"hi\"" + 1', "x =")
+    assert body == r"say \"hi\""
+    assert decode_string_literal(body) == 'say "hi"'
+
+
+def test_quote_after_escaped_backslash_ends_literal():
+    assert find_string_literal(r'x = "a\\" + "b"', "x =") == r"a\\"
+
+
+def test_single_quoted_literal():
+    body = find_string_literal("""x = 'say "hi", it\\'s me';""", "x =")
+    assert body == """say "hi", it\\'s me"""
+    assert decode_string_literal(body) == """say "hi", it's me"""
+
+
+def test_missing_marker_or_literal():
+    assert find_string_literal("nothing here", "x =") is None
+    assert find_string_literal("x = 42", "x =") is None
+    assert find_string_literal('x = "unterminated', "x =") is None
+
+
+def test_extract_json_parse():
+    page = r"""<script>window._gallery = JSON.parse("{\"id\":7,\"title\":\"A \\\"B\\\"\",\"tags\":[\x22x\x22]}");</script>"""
+    assert extract_json_parse(page) == {"id": 7, "title": 'A "B"', "tags": ["x"]}
+
+
+def test_extract_json_parse_invalid():
+    assert extract_json_parse('JSON.parse("{not json")') is None
+    assert extract_json_parse("<p>no script</p>") is None
@@ -0,0 +1,77 @@
+import pytest
+
+from src.lib import html
+from src.lib.html import ParseOnly, available_parsers, default_parser, parse_html
+
+LISTING = """
+<html><head><script>var noise = 1;</script></head><body>
+<nav><a href="/home">Home</a></nav>
+<div class="page-item-detail manga"><h3><a href="/serie/one/">One</a></h3></div>
+<div class="page-item-detail"><h3><a href="/serie/two/">Two</a></h3></div>
+<footer><div class="widget">Footer</div></footer>
+</body></html>
+"""
+
+
+@pytest.fixture
+def reset_parser(monkeypatch):
+    monkeypatch.setattr(html, "_default_parser", None)
+    return monkeypatch
+
+
+def test_html_parser_is_always_available():
+    assert "html.parser" in available_parsers()
+
+
+def test_default_parser_honours_html_parser(reset_parser):
+    reset_parser.setenv("HTML_PARSER", "html.parser")
+    assert default_parser() == "html.parser"
+
+
+def test_unknown_parser_falls_back(reset_parser):
+    reset_parser.setenv("HTML_PARSER", "no-such-parser")
+    assert default_parser() in html.AUTO_ORDER
+
+
+@pytest.mark.parametrize("parser", [parser for parser in html.PARSERS if parser != "selectolax"])
+def test_parse_html_with_beautifulsoup_backends(parser):
+    pytest.importorskip("bs4")
+    if parser not in available_parsers():
+        pytest.skip(f"{parser} is not installed")
+    soup = parse_html(LISTING, parser)
+    assert [a.get("href") for a in soup.select("div.page-item-detail a")] == ["/serie/one/", "/serie/two/"]
+
+
+def test_selectolax_node_matches_beautifulsoup_api():
+    pytest.importorskip("selectolax")
+    root = parse_html(LISTING, "selectolax")
+    links = root.select("div.page-item-detail a")
+    assert [link.get("href") for link in links] == ["/serie/one/", "/serie/two/"]
+    assert links[0].text == "One"
+    assert links[0].string == "One"
+    assert root.select_one("div.page-item-detail").string is None
+    assert root.select_one("span.missing") is None
+    assert links[0].get("title", "none") == "none"
+    assert links[0].name == "a"
+
+
+def test_parse_only_normalizes_attribute_names():
+    only = ParseOnly(["div", "li"], class_="page-item-detail", id_=["a", "b"])
+    assert only.name == ["div", "li"]
+    assert only.attrs == {"class": "page-item-detail", "id": ["a", "b"]}
+
+
+def test_parse_only_builds_just_the_matching_elements():
+    pytest.importorskip("bs4")
+    soup = parse_html(LISTING, "html.parser", only=ParseOnly("div", class_="page-item-detail"))
+    assert [a.text for a in soup.select("div.page-item-detail a")] == ["One", "Two"]
+    assert soup.select("script") == []
+    assert soup.select("nav") == []
+    assert soup.select("div.widget") == []
+
+
+def test_parse_only_matches_any_of_several_classes():
+    pytest.importorskip("bs4")
+    markup = '<div class="c-tabs-item__content">A</div><div class="page-item-detail">B</div><div class="other">C</div>'
+    soup = parse_html(markup, "html.parser", only=ParseOnly("div", class_=["c-tabs-item__content", "page-item-detail"]))
+    assert [div.text for div in soup.select("div")] == ["A", "B"]
@@ -0,0 +1,61 @@
+from typing import List, TypedDict
+
+import pytest
+
+from src.lib import json_codec
+
+INSTALLED = [codec for codec in json_codec.CODECS if json_codec._available(codec)]
+
+
+class Entry(TypedDict, total=False):
+    hid: str
+
+
+class Listing(TypedDict, total=False):
+    chapters: List[Entry]
+
+
+class Record():
+    def get(self):
+        return {"id": "r1"}
+
+
+@pytest.mark.parametrize("codec", INSTALLED)
+def test_round_trip(codec):
+    value = {"title": "Ōkami", "pages": [1, 2.5, None, True], "nested": {"a": []}}
+    assert json_codec.loads(json_codec.dumps(value, codec), codec) == value
+
+
+@pytest.mark.parametrize("codec", INSTALLED)
+def test_decode_errors_are_value_errors(codec):
+    with pytest.raises(ValueError):
+        json_codec.loads(b"{not json", codec)
+    with pytest.raises(ValueError):
+        json_codec.decode(b"[1,", Listing, codec)
+
+
+@pytest.mark.parametrize("codec", INSTALLED)
+def test_dumps_encodes_non_json_values(codec):
+    encoded = json_codec.loads(json_codec.dumps({"tags": ("a",), "record": Record()}, codec))
+    assert encoded == {"tags": ["a"], "record": {"id": "r1"}}
+
+
+@pytest.mark.parametrize("codec", INSTALLED)
+def test_decode_with_schema_keeps_read_fields(codec):
+    data = b'{"chapters": [{"hid": "AbC", "chap": "1"}], "total": 1}'
+    decoded = json_codec.decode(data, Listing, codec)
+    assert decoded["chapters"][0]["hid"] == "AbC"
+
+
+def test_decode_falls_back_when_the_document_does_not_fit():
+    assert json_codec.decode(b'{"chapters": "none"}', Listing) == {"chapters": "none"}
+
+
+def test_codec_name_honours_json_codec(monkeypatch):
+    monkeypatch.setattr(json_codec, "_codec", None)
+    monkeypatch.setenv("JSON_CODEC", "json")
+    assert json_codec.codec_name() == "json"
+
+    monkeypatch.setattr(json_codec, "_codec", None)
+    monkeypatch.setenv("JSON_CODEC", "no-such-codec")
+    assert json_codec.codec_name() == INSTALLED[0]
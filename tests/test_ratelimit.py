@@ -0,0 +1,155 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.lib.ratelimit import HostLimiter, RateLimitTimeout, parse_retry_after
+
+
+def fast_limiter(**options) -> HostLimiter:
+    # A bucket large enough that only the window and pauses hold requests back.
+    return HostLimiter("example.com", rate=1000, burst=1000, **options)
+
+
+def wait_for_queue(limiter: HostLimiter, length: int):
+    deadline = time.monotonic() + 2
+    while limiter.stats()["waiting"] < length:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_waiters_are_served_in_arrival_order():
+    limiter = fast_limiter(window=1, max_window=1)
+    limiter.acquire()
+    order = []
+
+    def worker(index):
+        limiter.acquire()
+        order.append(index)
+        limiter.release(200)
+
+    threads = []
+    for index in range(5):
+        thread = threading.Thread(target=worker, args=(index,))
+        thread.start()
+        wait_for_queue(limiter, index + 1)
+        threads.append(thread)
+
+    limiter.release(200)
+    for thread in threads:
+        thread.join(2)
+    assert order == [0, 1, 2, 3, 4]
+
+
+def test_throttled_response_halves_window_and_caps_pause():
+    limiter = fast_limiter(window=8, max_pause=0.5)
+    limiter.acquire()
+    limiter.release(429, 3600)
+    assert limiter.window == 4
+    assert 0 < limiter.paused_for() <= 0.5
+    assert limiter.throttled == 1
+
+
+def test_pause_without_retry_after_uses_backoff():
+    limiter = fast_limiter(backoff=0.2)
+    limiter.acquire()
+    limiter.release(503)
+    assert 0.1 < limiter.paused_for() <= 0.2
+
+
+def test_acquire_times_out_instead_of_waiting_out_a_pause():
+    limiter = fast_limiter()
+    limiter.acquire()
+    limiter.release(429, 30)
+    started = time.monotonic()
+    with pytest.raises(RateLimitTimeout) as error:
+        limiter.acquire(timeout=1)
+    assert time.monotonic() - started < 0.5
+    assert error.value.retry_after > 1
+    assert limiter.stats()["waiting"] == 0
+    assert limiter.timeouts == 1
+
+
+def test_queued_acquire_times_out_and_leaves_the_queue():
+    limiter = fast_limiter(window=1, max_window=1)
+    limiter.acquire()
+    with pytest.raises(RateLimitTimeout):
+        limiter.acquire(timeout=0.05)
+    assert limiter.stats()["waiting"] == 0
+    limiter.release(200)
+    limiter.acquire(timeout=0.05)
+
+
+def test_cancelled_waiter_during_pause_hands_over_its_turn():
+    limiter = fast_limiter(window=2, max_pause=0.1)
+
+    async def main():
+        await limiter.acquire_async()
+        limiter.release(429, 10)
+        first = asyncio.ensure_future(limiter.acquire_async())
+        second = asyncio.ensure_future(limiter.acquire_async())
+        await asyncio.sleep(0.01)
+        assert limiter.stats()["waiting"] == 2
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        started = time.monotonic()
+        await asyncio.wait_for(second, 1)
+        return time.monotonic() - started
+
+    waited = asyncio.run(main())
+    assert waited < 0.2
+    assert limiter.paused_for() == 0
+    assert limiter.stats()["waiting"] == 0
+    assert limiter.in_flight == 1
+
+
+def test_async_acquire_times_out():
+    limiter = fast_limiter(window=1, max_window=1)
+
+    async def main():
+        await limiter.acquire_async()
+        with pytest.raises(RateLimitTimeout):
+            await limiter.acquire_async(timeout=0.05)
+
+    asyncio.run(main())
+    assert limiter.stats()["waiting"] == 0
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("120") == 120
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+
+
+def test_sources_surface_rate_limit_timeouts():
+    from src.sources.comick import Comick
+    from src.sources.nhentai import NHentai
+
+    def throttled(*args, **kwargs):
+        raise RateLimitTimeout("example.com", 5)
+
+    comick = Comick()
+    comick.fetch_json = throttled
+    with pytest.raises(RateLimitTimeout):
+        comick._make_request("https://example.com/comic")
+
+    nhentai = NHentai()
+    nhentai.fetch_json = nhentai.fetch_text = nhentai.fetch_html = throttled
+    with pytest.raises(RateLimitTimeout):
+        nhentai.popular_manga_request()
+    with pytest.raises(RateLimitTimeout):
+        nhentai._search_page_html("query", 1)
+    with pytest.raises(RateLimitTimeout):
+        nhentai._load_gallery("1")
+
+
+def test_toonily_defaults_fit_a_listing_with_chapters():
+    from src.lib.ratelimit import RateLimiter
+
+    limiter = RateLimiter().host("toonily.com")
+    assert limiter.burst >= 41
+    assert limiter.window >= 8
+    assert RateLimiter().host("api.comick.fun").rate == 5.0
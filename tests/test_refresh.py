@@ -0,0 +1,50 @@
+import asyncio
+
+from src.lib.refresh import BackgroundRefresher
+
+
+def test_one_refresh_per_key_and_limit_per_source():
+    refresher = BackgroundRefresher(per_source_limit=2)
+
+    async def main():
+        gate = asyncio.Event()
+        refreshed = []
+
+        async def refresh(key):
+            await gate.wait()
+            refreshed.append(key)
+
+        assert refresher.schedule("toonily", "a", lambda: refresh("a"))
+        assert not refresher.schedule("toonily", "a", lambda: refresh("a"))
+        assert refresher.schedule("toonily", "b", lambda: refresh("b"))
+        # Over the per-source cap: skipped, not queued.
+        assert not refresher.schedule("toonily", "c", lambda: refresh("c"))
+        assert refresher.schedule("comick", "d", lambda: refresh("d"))
+        gate.set()
+        await asyncio.sleep(0.01)
+        # Keys and slots are free again once a refresh finishes.
+        assert refresher.schedule("toonily", "a", lambda: refresh("a"))
+        await asyncio.sleep(0.01)
+        return refreshed
+
+    assert sorted(asyncio.run(main())) == ["a", "a", "b", "d"]
+    stats = refresher.stats()
+    assert stats["scheduled"] == 4
+    assert stats["skipped"] == 1
+    assert stats["completed"] == 4
+    assert stats["running"] == {}
+
+
+def test_failed_refresh_is_counted_and_released():
+    refresher = BackgroundRefresher()
+
+    async def fail():
+        raise RuntimeError("upstream down")
+
+    async def main():
+        refresher.schedule("toonily", "a", fail)
+        await asyncio.sleep(0.01)
+        return refresher.schedule("toonily", "a", fail)
+
+    assert asyncio.run(main())
+    assert refresher.failed >= 1
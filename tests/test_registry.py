@@ -0,0 +1,45 @@
+import json
+
+from src.lib.registry import MANIFEST_PATH, SourceRegistry, discover_sources
+
+built = []
+
+
+class FakeScraper():
+    def __init__(self):
+        built.append(self)
+
+
+def write_manifest(tmp_path) -> str:
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps([
+        {"key": "fake", "name": "Fake", "url": "https://fake.example", "module": __name__, "class": "FakeScraper"},
+    ]))
+    return str(path)
+
+
+def test_sources_are_built_on_first_use_only(tmp_path):
+    built.clear()
+    registry = SourceRegistry.from_manifest(write_manifest(tmp_path))
+    assert "FAKE" in registry
+    assert registry.describe() == [{"name": "Fake", "url": "https://fake.example"}]
+    assert not registry.is_loaded("fake")
+    assert built == []
+
+    scraper = registry.get("Fake")
+    assert registry.get("fake") is scraper
+    assert registry["fake"] is scraper
+    assert built == [scraper]
+
+
+def test_unknown_source(tmp_path):
+    registry = SourceRegistry.from_manifest(write_manifest(tmp_path))
+    assert registry.get("missing") is None
+    assert "missing" not in registry
+
+
+def test_manifest_matches_the_sources_directory():
+    with open(MANIFEST_PATH, encoding="utf-8") as f:
+        manifest = json.load(f)
+    discovered = [entry.get() for entry in discover_sources()]
+    assert sorted(manifest, key=lambda item: item["key"]) == sorted(discovered, key=lambda item: item["key"])
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from src.lib.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("k", work, operation="op") for _ in range(5)))
+
+    assert asyncio.run(main()) == ["result"] * 5
+    assert len(calls) == 1
+    assert flight.stats()["by_operation"] == {"op": {"executions": 1, "coalesced": 4}}
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+
+    async def main():
+        return await asyncio.gather(flight.do("a", lambda: asyncio.sleep(0, "a")), flight.do("b", lambda: asyncio.sleep(0, "b")))
+
+    assert asyncio.run(main()) == ["a", "b"]
+    assert flight.executions == 2
+
+
+def test_exception_reaches_every_waiter():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    async def main():
+        return await asyncio.gather(flight.do("k", fail), flight.do("k", fail), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.executions == 1
+
+
+def test_cancelled_waiter_does_not_cancel_the_call():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.02)
+        return 42
+
+    async def main():
+        first = asyncio.ensure_future(flight.do("k", work))
+        second = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == 42
+
+
+def test_key_is_released_after_completion():
+    flight = SingleFlight()
+
+    async def main():
+        await flight.do("k", lambda: asyncio.sleep(0, 1))
+        await flight.do("k", lambda: asyncio.sleep(0, 2))
+
+    asyncio.run(main())
+    assert flight.executions == 2
+    assert flight.coalesced == 0